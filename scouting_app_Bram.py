@@ -2,11 +2,16 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-from PIL import Image
+import pyarrow as pa
 import base64
-from io import BytesIO
+import hmac
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode, JsCode
+from st_aggrid import AgGrid, DataReturnMode, GridOptionsBuilder, GridUpdateMode, JsCode
 from supabase import create_client, Client
 
 
@@ -15,6 +20,10 @@ from supabase import create_client, Client
 # =========================
 def check_password():
     """Returns `True` if the user has entered the correct password."""
+    # Already authenticated this session: skip the widget and secrets lookups on every rerun
+    if st.session_state.get("password_correct"):
+        return True
+
     def password_entered():
         """Checks whether a password entered by the user is correct."""
         # Get password from Streamlit secrets (no fallback for security)
@@ -22,7 +31,7 @@ def check_password():
             st.error("⚠️ APP_PASSWORD not configured. Please contact the administrator.")
             return
         
-        if st.session_state["password"] == st.secrets["APP_PASSWORD"]:
+        if hmac.compare_digest(st.session_state["password"].encode(), str(st.secrets["APP_PASSWORD"]).encode()):
             st.session_state["password_correct"] = True
             del st.session_state["password"]  # Don't store password
         else:
@@ -104,6 +113,16 @@ DMCM_PROFILE_DEFENSE_METRICS = [
     "aerial_duels_won_p90_percentile",
     "press_total_count_otip_p30_percentile"
 ]
+
+# Columns fetched from player_percentiles (everything else in the table is never read by the app)
+REQUIRED_COLS = list(dict.fromkeys(
+    ["player_id", "player_name", "team_name", "country", "age", "position", "position_profile",
+     "position_minutes", "competition_name", "season_name", "iterationid", "european",
+     "total_minutes", "physical", "attacking", "defending", "total"] +
+    PHYSICAL_METRICS + ATTACK_METRICS + DEFENSE_METRICS +
+    DMCM_PROFILE_PHYSICAL_METRICS + DMCM_PROFILE_ATTACK_METRICS + DMCM_PROFILE_DEFENSE_METRICS
+))
+
 LABELS = {
     "total_distance_p90_percentile": "Totale\nafstand",
     "running_distance_p90_percentile": "15-20km/u\nafstand",
@@ -147,96 +166,197 @@ DISPLAY_COLS = {
 
 FC_GRONINGEN_GREEN = "#3E8C5E"
 
-# ✅ Paste your existing huge TEAM_LOGO_MAPPING here unchanged
+# Logos are indexed from TEAM_LOGOS_DIR at runtime (see _team_logo_index).
+# Only add teams here whose data name does not match their logo file name.
 TEAM_LOGO_MAPPING = {
-    # ... keep your full mapping exactly as-is ...
 }
 
+# Inline team logo (data URI, height in px) placed before a team name
+TEAM_LOGO_IMG_HTML = '<img src="{0}" height="{1}" style="vertical-align: middle; margin-right: 8px;">'
+# Comparison card heading with the player's name
+COMPARISON_NAME_HTML = "<p style='font-size: 1.5rem; font-weight: 600; margin-bottom: 0.5rem;'>{0}</p>"
+# Comparison card caption: optional logo <img> followed by the ' · '-joined player facts
+COMPARISON_CAPTION_HTML = '<div style="font-size: 1.1rem; margin-bottom: 1rem; line-height: 1.6;">{logo}{caption}</div>'
+
 # =========================
 # CSS with FC Groningen styling
 # =========================
-st.markdown(
-    f"""
+# Plain constant (no f-string formatting per rerun). It is still emitted on every run because
+# Streamlit drops elements that a rerun does not write again.
+APP_CSS = """
+    <link rel="preconnect" href="https://fonts.cdnfonts.com" crossorigin>
     <style>
       @import url('https://fonts.cdnfonts.com/css/proxima-nova-2');
 
-      html, body, [class*="css"], .stApp {{
+      html, body, [class*="css"], .stApp {
         font-family: 'Proxima Nova', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif !important;
-      }}
+      }
 
-      section[data-testid="stSidebar"] {{
+      section[data-testid="stSidebar"] {
         background-color: #F4F6F8;
         overflow-y: auto !important;
-      }}
+      }
 
-      section[data-testid="stSidebar"] > div {{
+      section[data-testid="stSidebar"] > div {
         overflow-y: visible !important;
-      }}
+      }
 
-      section[data-testid="stSidebar"] > div:first-child {{
+      section[data-testid="stSidebar"] > div:first-child {
         padding-top: 0 !important;
-      }}
+      }
 
-      section[data-testid="stSidebar"] .block-container {{
+      section[data-testid="stSidebar"] .block-container {
         padding-top: 0.2rem !important;
         padding-left: 1rem !important;
         padding-right: 1rem !important;
         padding-bottom: 0.5rem !important;
-      }}
+      }
 
-      section[data-testid="stSidebar"] div[data-testid="stVerticalBlock"] > div {{
+      section[data-testid="stSidebar"] div[data-testid="stVerticalBlock"] > div {
         padding-top: 0rem !important;
         padding-bottom: 0rem !important;
-      }}
+      }
 
-      div[data-testid="stVerticalBlock"] > div {{
+      div[data-testid="stVerticalBlock"] > div {
         padding-top: 0.05rem;
         padding-bottom: 0.05rem;
-      }}
+      }
 
-      section[data-testid="stSidebar"] label {{
+      section[data-testid="stSidebar"] label {
         margin-bottom: 0.2rem !important;
         font-size: 14px !important;
-      }}
+      }
 
-      section[data-testid="stSidebar"] div[data-baseweb="select"] {{
+      section[data-testid="stSidebar"] div[data-baseweb="select"] {
         margin-bottom: 0.3rem !important;
-      }}
+      }
 
-      section[data-testid="stSidebar"] div[data-testid="stSlider"] {{
+      section[data-testid="stSidebar"] div[data-testid="stSlider"] {
         padding-top: 0rem !important;
         padding-bottom: 0.3rem !important;
-      }}
+      }
 
-      section[data-testid="stSidebar"] .element-container {{
+      section[data-testid="stSidebar"] .element-container {
         margin-bottom: 0.2rem !important;
-      }}
+      }
 
-      .sb-title {{
+      .sb-title {
         font-size: 24px;
         font-weight: 700;
         margin: 0 0 4px 0;
         padding: 0;
         font-family: 'Proxima Nova', sans-serif !important;
-      }}
-      .sb-rule {{
+      }
+      .sb-rule {
         height: 1px;
         background: rgba(0,0,0,0.12);
         margin: 0 0 8px 0;
-      }}
-
-      div[data-testid="stSlider"] * {{ color: #111111 !important; }}
-      section[data-testid="stSidebar"] div[data-testid="stSlider"] * {{ color: #111111 !important; }}
-      div[data-baseweb="slider"] * {{ color: #111111 !important; }}
+      }
+
+      div[data-testid="stSlider"] * { color: #111111 !important; }
+      section[data-testid="stSidebar"] div[data-testid="stSlider"] * { color: #111111 !important; }
+      div[data-baseweb="slider"] * { color: #111111 !important; }
+
+      /* Comparison charts fade in */
+      @keyframes fadeIn {
+        from { opacity: 0; transform: translateY(10px); }
+        to { opacity: 1; transform: translateY(0); }
+      }
+      .stPlotlyChart {
+        animation: fadeIn 0.5s ease-in-out;
+      }
     </style>
-    """,
-    unsafe_allow_html=True,
-)
+    """
+
+st.markdown(APP_CSS, unsafe_allow_html=True)
 
 
 # =========================
 # CHARTS
 # =========================
+# Static part of the polarized bar chart, built once at import and copied per player
+_POLAR_BAR_PROTOTYPE = go.Figure(go.Barpolar(
+    marker=dict(line=dict(color='white', width=2)),
+    opacity=1.0,
+    name='',
+    hovertemplate='%{theta}<br>Percentile: %{r:.1f}<extra></extra>'
+))
+_POLAR_BAR_PROTOTYPE.update_layout(
+    polar=dict(
+        domain=dict(x=[0.02, 0.98], y=[0.0, 0.88]),
+        radialaxis=dict(
+            visible=True,
+            range=[-20, 100],
+            showticklabels=False,
+            ticks='',
+            showline=False,
+            showgrid=True,
+            gridcolor='rgba(0, 0, 0, 0.2)',
+            gridwidth=1,
+            tickvals=[25, 50, 75, 100],
+            layer='above traces'
+        ),
+        angularaxis=dict(
+            tickfont=dict(size=10, family='Proxima Nova', color='#000000'),
+            rotation=90,
+            direction='clockwise',
+            showgrid=False,
+            gridcolor='rgba(0, 0, 0, 0.2)',
+            gridwidth=1,
+            layer='above traces'
+        ),
+        bgcolor='rgba(255, 255, 255, 1)'
+    ),
+    showlegend=False,
+    height=500,
+    margin=dict(l=80, r=80, t=120, b=80),
+    title=dict(
+        x=0.5, y=0.95, xanchor='center', yanchor='top',
+        font=dict(size=16, family='Proxima Nova', color='black')
+    ),
+    paper_bgcolor='rgba(255, 255, 255, 1)',
+    plot_bgcolor='rgba(255, 255, 255, 1)'
+)
+
+
+# Per-category base colors (green / red / yellow), one row per category id
+_CATEGORY_DTYPE = np.dtype([('r', 'u1'), ('g', 'u1'), ('b', 'u1')])
+_CATEGORY_TABLE = np.array([(62, 140, 94), (232, 63, 42), (242, 181, 51)], dtype=_CATEGORY_DTYPE)
+_CATEGORY_RGB = np.stack([_CATEGORY_TABLE['r'], _CATEGORY_TABLE['g'], _CATEGORY_TABLE['b']], axis=1).astype(np.float64)
+# Lightened (60% towards white) counterparts used for a score of 0
+_CATEGORY_LIGHT_RGB = np.floor(_CATEGORY_RGB + (255 - _CATEGORY_RGB) * 0.6)
+# Bar color per category for every integer score 0..100 (light -> full color), indexed [category, score]
+_CATEGORY_COLOR_LUT = np.array([
+    [f'rgb({r},{g},{b})' for r, g, b in
+     np.floor(light + (base - light) * np.linspace(0, 1, 101)[:, None]).astype(int).tolist()]
+    for base, light in zip(_CATEGORY_RGB, _CATEGORY_LIGHT_RGB)
+])
+
+
+def _build_metric_layout(physical: list, attack: list, defense: list) -> dict:
+    """Columns, chart labels and per-metric category ids for one radar metric set, laid out side by side."""
+    seg_sizes = np.array([len(physical), len(attack), len(defense)])
+    category = np.repeat(np.arange(3), seg_sizes)
+    columns = physical + attack + defense
+    return {
+        'physical': physical,
+        'attack': attack,
+        'defense': defense,
+        'columns': columns,
+        'labels': [LABELS.get(col, col).replace('\n', '<br>') for col in columns],
+        'category': category,
+        'seg_sizes': seg_sizes,
+        'seg_starts': np.concatenate(([0], np.cumsum(seg_sizes)[:-1])),
+    }
+
+
+# Keyed on whether the player is a DM/CM profile
+_METRIC_LAYOUTS = {
+    False: _build_metric_layout(PHYSICAL_METRICS, ATTACK_METRICS, DEFENSE_METRICS),
+    True: _build_metric_layout(DMCM_PROFILE_PHYSICAL_METRICS, DMCM_PROFILE_ATTACK_METRICS, DMCM_PROFILE_DEFENSE_METRICS),
+}
+
+
 def create_polarized_bar_chart(player_data: pd.Series, competition_name: str, season_name: str) -> go.Figure:
     """
     Create a polarized bar chart (circular bar chart) for a player.
@@ -262,51 +382,10 @@ def create_polarized_bar_chart(player_data: pd.Series, competition_name: str, se
 
     is_dmcm_profile = bool(display_pos) and display_pos.startswith("DM/CM (") and display_pos.endswith(")")
 
-    # Use profile label in the chart caption when available
-    position_caption = display_pos if display_pos else (str(player_data.get('position')) if 'position' in player_data.index else "")
-
-    physical_metrics = DMCM_PROFILE_PHYSICAL_METRICS if is_dmcm_profile else PHYSICAL_METRICS
-    attack_metrics   = DMCM_PROFILE_ATTACK_METRICS   if is_dmcm_profile else ATTACK_METRICS
-    defense_metrics  = DMCM_PROFILE_DEFENSE_METRICS  if is_dmcm_profile else DEFENSE_METRICS
-
-    green = '#3E8C5E'
-    red = '#E83F2A'
-    yellow = '#F2B533'
-
-    def lighten_color(hex_color, amount=0.6):
-        hex_color = hex_color.lstrip('#')
-        r, g, b = int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16)
-        r = int(r + (255 - r) * amount)
-        g = int(g + (255 - g) * amount)
-        b = int(b + (255 - b) * amount)
-        return f'#{r:02x}{g:02x}{b:02x}'
-
-    def get_gradient_color(base_color, score, min_score=0, max_score=100):
-        normalized = (score - min_score) / (max_score - min_score) if max_score > min_score else 0
-        normalized = max(0, min(1, normalized))
-        light_color = lighten_color(base_color, amount=0.6)
-        light_rgb = tuple(int(light_color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-        dark_rgb = tuple(int(base_color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-        r = int(light_rgb[0] + (dark_rgb[0] - light_rgb[0]) * normalized)
-        g = int(light_rgb[1] + (dark_rgb[1] - light_rgb[1]) * normalized)
-        b = int(light_rgb[2] + (dark_rgb[2] - light_rgb[2]) * normalized)
-        return f'rgb({r},{g},{b})'
-
-    plot_columns = physical_metrics + attack_metrics + defense_metrics
-    percentile_values = [player_data[col] if col in player_data.index else 0 for col in plot_columns]
-
-    category_mapping = (
-        [1] * len(physical_metrics) +
-        [2] * len(attack_metrics) +
-        [3] * len(defense_metrics)
-    )
-
-    category_colors = {1: green, 2: red, 3: yellow}
-
-    colors = []
-    for score, category_id in zip(percentile_values, category_mapping):
-        base_color = category_colors[category_id]
-        colors.append(get_gradient_color(base_color, score))
+    layout = _METRIC_LAYOUTS[is_dmcm_profile]
+    plot_columns = layout['columns']
+    # One reindex for all bars (metrics missing from the row plot as 0, NaN stays NaN)
+    percentile_values = player_data.reindex(plot_columns, fill_value=0.0).to_numpy(dtype=np.float64)
 
     # ✅ Category averages
     if all(k in player_data.index for k in ['physical', 'attack', 'defense']):
@@ -314,9 +393,9 @@ def create_polarized_bar_chart(player_data: pd.Series, competition_name: str, se
         attack_avg   = float(player_data['attack'])
         defense_avg  = float(player_data['defense'])
     else:
-        physical_avg = float(np.mean(percentile_values[0:len(physical_metrics)]))
-        attack_avg   = float(np.mean(percentile_values[len(physical_metrics):len(physical_metrics)+len(attack_metrics)]))
-        defense_avg  = float(np.mean(percentile_values[len(physical_metrics)+len(attack_metrics):]))
+        # One reduceat over the contiguous category segments instead of three slice + mean passes
+        cat_avgs = np.add.reduceat(percentile_values, layout['seg_starts']) / layout['seg_sizes']
+        physical_avg, attack_avg, defense_avg = (float(v) for v in cat_avgs)
 
     # ✅ FIX: Overall score should match the table's Total column.
     # Prefer the stored 'total' value (already weighted/defined by the model); fallback to mean of category scores.
@@ -325,60 +404,37 @@ def create_polarized_bar_chart(player_data: pd.Series, competition_name: str, se
     else:
         overall_avg = float(np.mean([physical_avg, attack_avg, defense_avg]))
 
-    metric_labels = [LABELS.get(col, col).replace('\n', '<br>') for col in plot_columns]
+    return _polarized_bar_chart(
+        is_dmcm_profile, tuple(percentile_values), (physical_avg, attack_avg, defense_avg), overall_avg,
+        competition_name, season_name
+    )
 
-    fig = go.Figure()
-    fig.add_trace(go.Barpolar(
-        r=percentile_values,
-        theta=metric_labels,
-        marker=dict(color=colors, line=dict(color='white', width=2)),
-        opacity=1.0,
-        name='',
-        text=[f'{v:.0f}' for v in percentile_values],
-        hovertemplate='%{theta}<br>Percentile: %{r:.1f}<extra></extra>'
-    ))
 
-    fig.update_layout(
-        polar=dict(
-            domain=dict(x=[0.02, 0.98], y=[0.0, 0.88]),
-            radialaxis=dict(
-                visible=True,
-                range=[-20, 100],
-                showticklabels=False,
-                ticks='',
-                showline=False,
-                showgrid=True,
-                gridcolor='rgba(0, 0, 0, 0.2)',
-                gridwidth=1,
-                tickvals=[25, 50, 75, 100],
-                layer='above traces'
-            ),
-            angularaxis=dict(
-                tickfont=dict(size=10, family='Proxima Nova', color='#000000'),
-                rotation=90,
-                direction='clockwise',
-                showgrid=False,
-                gridcolor='rgba(0, 0, 0, 0.2)',
-                gridwidth=1,
-                layer='above traces'
-            ),
-            bgcolor='rgba(255, 255, 255, 1)'
-        ),
-        showlegend=False,
-        height=500,
-        margin=dict(l=80, r=80, t=120, b=80),
-        title=dict(
-            text=(
-                f"<b>Overall: {overall_avg:.1f}</b><br>"
-                f"<span style='font-size:14px'>🟢 Fysiek: {physical_avg:.1f} | 🔴 Aanvallen: {attack_avg:.1f} | 🟡 Verdedigen: {defense_avg:.1f}</span><br>"
-                f"<span style='font-size:11px; color:#666'>{competition_name} | {season_name}</span>"
-            ),
-            x=0.5, y=0.95, xanchor='center', yanchor='top',
-            font=dict(size=16, family='Proxima Nova', color='black')
-        ),
-        paper_bgcolor='rgba(255, 255, 255, 1)',
-        plot_bgcolor='rgba(255, 255, 255, 1)'
-    )
+@st.cache_resource(ttl=3600, max_entries=256, show_spinner=False)
+def _polarized_bar_chart(is_dmcm_profile: bool, percentile_values: tuple, category_avgs: tuple, overall_avg: float,
+                         competition_name: str, season_name: str) -> go.Figure:
+    """Chart body of create_polarized_bar_chart; takes plain scalars so reruns with the same player hit the cache.
+
+    Cached as a shared resource: a cache_data hit would unpickle the figure, which rebuilds and re-validates
+    it. The returned figure is only handed to st.plotly_chart and must not be mutated.
+    """
+    layout = _METRIC_LAYOUTS[is_dmcm_profile]
+    physical_avg, attack_avg, defense_avg = category_avgs
+
+    # Each bar runs from the lightened category color (low score) to the full color (high score); look it up by score
+    scores = np.rint(np.clip(np.nan_to_num(np.asarray(percentile_values, dtype=float)), 0, 100)).astype(int)
+    colors = _CATEGORY_COLOR_LUT[layout['category'], scores].tolist()
+
+    metric_labels = layout['labels']
+
+    # Copy the pre-built prototype; only the bar values, colors and title differ per player
+    fig = go.Figure(_POLAR_BAR_PROTOTYPE)
+    fig.data[0].update(r=list(percentile_values), theta=metric_labels, marker_color=colors)
+    fig.update_layout(title_text=(
+        f"<b>Overall: {overall_avg:.1f}</b><br>"
+        f"<span style='font-size:14px'>🟢 Fysiek: {physical_avg:.1f} | 🔴 Aanvallen: {attack_avg:.1f} | 🟡 Verdedigen: {defense_avg:.1f}</span><br>"
+        f"<span style='font-size:11px; color:#666'>{competition_name} | {season_name}</span>"
+    ))
 
     return fig
 
@@ -386,32 +442,84 @@ def create_polarized_bar_chart(player_data: pd.Series, competition_name: str, se
 # =========================
 # Data
 # =========================
-@st.cache_data(ttl=3600)
-def load_data_from_supabase() -> pd.DataFrame:
-    """Load ALL data from Supabase database (handles pagination for >1000 rows)"""
-    try:
-        supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+@st.cache_resource
+def get_supabase() -> Client:
+    """Supabase client shared across loads and sessions (reuses its HTTP connection pool)"""
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+
+SUPABASE_PAGE_SIZE = 1000
+
+
+def fetch_all_rows(table: str, columns: list = None) -> list:
+    """Fetch every row of a table, requesting the 1000-row pages in parallel once the row count is known.
+
+    Of the given `columns` only those present in the table are requested (None requests all columns).
+    """
+    supabase = get_supabase()
+
+    # The count request returns a single full row, which shows the columns this table version has
+    probe = supabase.table(table).select("*", count='exact').limit(1).execute()
+    total_count = probe.count or 0
+
+    # Optional columns (e.g. position_profile) are not present in every table version: leave the missing ones out
+    if columns is None:
+        selected_columns = "*"
+    else:
+        existing_columns = probe.data[0].keys() if probe.data else columns
+        selected_columns = ",".join(c for c in columns if c in existing_columns)
+
+    def fetch_page(offset: int) -> list:
+        return supabase.table(table).select(selected_columns).range(offset, offset + SUPABASE_PAGE_SIZE - 1).execute().data
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        return list(chain.from_iterable(executor.map(fetch_page, range(0, total_count, SUPABASE_PAGE_SIZE))))
+
+
+_CATEGORY_STARTS = np.cumsum([0, len(PHYSICAL_METRICS), len(ATTACK_METRICS)])
+
 
-        count_response = supabase.table('player_percentiles').select("*", count='exact').limit(1).execute()
-        total_count = count_response.count
+def category_means(df: pd.DataFrame) -> np.ndarray:
+    """Equal-weight physical/attack/defense averages (n x 3, NaN-skipping) in one pass over the metric block"""
+    block = df[PHYSICAL_METRICS + ATTACK_METRICS + DEFENSE_METRICS].to_numpy(dtype=np.float32)
+    valid = ~np.isnan(block)
+    sums = np.add.reduceat(np.where(valid, block, 0), _CATEGORY_STARTS, axis=1)
+    counts = np.add.reduceat(valid.astype(np.int32), _CATEGORY_STARTS, axis=1)
+    with np.errstate(invalid="ignore"):
+        return sums / counts
 
-        all_data = []
-        page_size = 1000
 
-        for offset in range(0, total_count, page_size):
-            response = supabase.table('player_percentiles').select("*").range(offset, offset + page_size - 1).execute()
-            all_data.extend(response.data)
+def row_nanmean(block: np.ndarray) -> np.ndarray:
+    """Row-wise mean skipping NaNs (NaN for all-NaN rows, without the RuntimeWarning of np.nanmean)"""
+    valid = ~np.isnan(block)
+    with np.errstate(invalid="ignore"):
+        return np.where(valid, block, 0).sum(axis=1) / valid.sum(axis=1)
 
-        df = pd.DataFrame(all_data)
+
+def load_data_from_supabase() -> pd.DataFrame:
+    """Load ALL data from Supabase database (handles pagination for >1000 rows)"""
+    try:
+        all_data = fetch_all_rows('player_percentiles', REQUIRED_COLS)
+
+        # Columnar ingest through Arrow (one typed pass per column instead of pandas' per-cell dtype sniffing);
+        # fall back to a dict of lists if a column mixes types Arrow cannot unify
+        try:
+            df = pa.Table.from_pylist(all_data).to_pandas() if all_data else pd.DataFrame(columns=REQUIRED_COLS)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            columns = list(all_data[0].keys())
+            df = pd.DataFrame({c: [row.get(c) for row in all_data] for c in columns})
 
         # ✅ FIX 3: Include category columns in numeric conversion
         numeric_cols = (
             ["age", "total_minutes", "physical", "attacking", "defending", "total"] +
             PHYSICAL_METRICS + ATTACK_METRICS + DEFENSE_METRICS
         )
-        for c in numeric_cols:
-            if c in df.columns:
-                df[c] = pd.to_numeric(df[c], errors="coerce")
+        # Columns that already arrived with a numeric dtype need no coercion pass
+        numeric_cols = [
+            c for c in numeric_cols if c in df.columns and not pd.api.types.is_numeric_dtype(df[c])
+        ]
+        if numeric_cols:
+            df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors="coerce")
 
         # ✅ FIX 2: Rename database columns to match app expectations
         if 'attacking' in df.columns:
@@ -421,29 +529,39 @@ def load_data_from_supabase() -> pd.DataFrame:
 
         # ✅ FIX 1: Use database scores (correctly weighted for position profiles)
         # Only calculate if database values are missing
-        if 'physical' not in df.columns or df['physical'].isna().all():
-            df['physical'] = df[PHYSICAL_METRICS].mean(axis=1)
-        if 'attack' not in df.columns or df['attack'].isna().all():
-            df['attack'] = df[ATTACK_METRICS].mean(axis=1)
-        if 'defense' not in df.columns or df['defense'].isna().all():
-            df['defense'] = df[DEFENSE_METRICS].mean(axis=1)
-        if 'total' not in df.columns or df['total'].isna().all():
-            df['total'] = df[['physical', 'attack', 'defense']].mean(axis=1)
+        means = category_means(df)
+        scores = df.reindex(columns=['physical', 'attack', 'defense', 'total']).to_numpy(dtype=float)
+        # A score column that is absent or entirely empty is filled on its own, so the database scores in the
+        # other columns are kept
+        for j in range(3):
+            if np.isnan(scores[:, j]).all():
+                scores[:, j] = means[:, j]
+        if np.isnan(scores[:, 3]).all():
+            scores[:, 3] = row_nanmean(scores[:, :3])
 
         # ✅ FIX 4: Calculate category scores for rows missing them (non-DM/CM players)
         # The scouting model only calculates scores for DM/CM, so other positions have NaN
-        mask_missing_scores = (
-            df['physical'].isna() | 
-            df['attack'].isna() | 
-            df['defense'].isna()
-        )
-        
-        if mask_missing_scores.any():
-            # Calculate simple averages (equal weights) for missing scores
-            df.loc[mask_missing_scores, 'physical'] = df.loc[mask_missing_scores, PHYSICAL_METRICS].mean(axis=1)
-            df.loc[mask_missing_scores, 'attack'] = df.loc[mask_missing_scores, ATTACK_METRICS].mean(axis=1)
-            df.loc[mask_missing_scores, 'defense'] = df.loc[mask_missing_scores, DEFENSE_METRICS].mean(axis=1)
-            df.loc[mask_missing_scores, 'total'] = df.loc[mask_missing_scores, ['physical', 'attack', 'defense']].mean(axis=1)
+        missing = np.isnan(scores[:, :3]).any(axis=1)
+        if missing.any():
+            # Calculate simple averages (equal weights) for missing scores, on the score block in place
+            scores[missing, :3] = means[missing]
+            scores[missing, 3] = row_nanmean(means[missing])
+
+        df[['physical', 'attack', 'defense', 'total']] = scores
+
+        # Percentile metrics, the 0-100 scores, age and minutes fit in float32 (whole numbers stay exact up to
+        # 2**24; age stays a float so missing ages remain NaN for the nanmin/nanmax slider bounds); repeated
+        # labels (players appear once per season/position) as categories
+        metric_cols = [c for c in dict.fromkeys(REQUIRED_COLS) if c.endswith("_percentile") and c in df.columns]
+        metric_cols += ['physical', 'attack', 'defense', 'total']
+        metric_cols += [c for c in ['age', 'total_minutes'] if c in df.columns]
+        df[metric_cols] = df[metric_cols].astype(np.float32)
+        for c in ["player_name", "team_name", "competition_name", "season_name", "position", "position_profile", "country"]:
+            if c in df.columns:
+                df[c] = df[c].astype("category")
+        # Plain bool so the European filter is a single in-place & on the mask (missing flags count as non-European)
+        if 'european' in df.columns:
+            df['european'] = (df['european'] == True).to_numpy()
 
         return df
 
@@ -454,46 +572,191 @@ def load_data_from_supabase() -> pd.DataFrame:
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=3600)
 def load_impect_urls_from_supabase() -> pd.DataFrame:
     """Load Impect URLs from player_impect_urls table"""
     try:
-        supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        all_urls = fetch_all_rows('player_impect_urls', ["player_id", "player_name", "iterationid", "position", "impect_url"])
+
+        df_urls = pd.DataFrame(all_urls)
+        return df_urls
+
+    except Exception as e:
+        st.warning(f"Could not load Impect URLs: {str(e)}")
+        return pd.DataFrame()
 
-        all_urls = []
-        page_size = 1000
-        offset = 0
 
-        while True:
-            response = supabase.table('player_impect_urls').select(
-                "player_id, player_name, iterationid, position, impect_url"
-            ).range(offset, offset + page_size - 1).execute()
+@st.cache_resource(ttl=3600)
+def load_player_frame() -> tuple:
+    """(player data merged with the Impect URLs, load token); one shared (read-only) frame for all reruns and sessions.
 
-            if not response.data:
-                break
+    This is the only cached copy of the data: the two loaders it calls are not cached themselves, so the
+    raw tables are not kept (and pickled) a second time next to the merged frame. The token is unique per
+    load and keys every cache of rows or labels of the frame (an object id can be reused after a reload).
+    """
+    df = load_data_from_supabase()
+    df_impect_urls = load_impect_urls_from_supabase()
 
-            all_urls.extend(response.data)
+    if not df_impect_urls.empty:
+        # Deduplicate: keep one URL per player/iteration/position to avoid row multiplication on merge
+        df_impect_urls_deduped = (
+            df_impect_urls[['player_id', 'iterationid', 'position', 'impect_url']]
+            .dropna(subset=['impect_url'])
+            .drop_duplicates(subset=['player_id', 'iterationid', 'position'], keep='first')
+        )
+        # Same categorical dtype as df['position'] so the merge joins on integer codes instead of strings
+        df_impect_urls_deduped['position'] = df_impect_urls_deduped['position'].astype(df['position'].dtype)
+        df = df.merge(
+            df_impect_urls_deduped,
+            on=['player_id', 'iterationid', 'position'],
+            how='left'
+        )
 
-            if len(response.data) < page_size:
-                break
+    # Resolve every team logo once up front so table and card renders only do dictionary lookups
+    pairs = df[['team_name', 'competition_name']].dropna(subset=['team_name']).drop_duplicates()
+    for team, competition in zip(pairs['team_name'], pairs['competition_name']):
+        get_team_logo_base64(team, competition if pd.notna(competition) else None)
 
-            offset += page_size
+    return df, uuid.uuid4().hex
 
-        df_urls = pd.DataFrame(all_urls)
-        return df_urls
 
-    except Exception as e:
-        st.warning(f"Could not load Impect URLs: {str(e)}")
-        return pd.DataFrame()
+def category_mask(col: pd.Series, selected: list) -> np.ndarray:
+    """`col.isin(selected)` for a categorical column, evaluated on its integer codes (missing values -> False)"""
+    lookup = np.append(col.cat.categories.isin(selected), False)
+    return lookup[col.cat.codes.to_numpy()]
+
+
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def filter_rows(_df: pd.DataFrame, data_key: str, competitions: tuple, seasons: tuple, age_range: tuple,
+                positions: tuple, dmcm_min_position_minutes: float, european_only: bool) -> tuple:
+    """Positional rows passing all sidebar filters, and those passing competition/season/age only (search pool).
+
+    Cached on the sidebar filters alone: changing Top N or a minimum slider reuses the masks (two small int arrays).
+    """
+    df = _df
+
+    # Build position filter that handles both regular positions and profiles (plain NumPy boolean arrays)
+    profile_positions = [p for p in positions if p.startswith("DM/CM (")]
+    position_mask = category_mask(df["position"], [p for p in positions if p not in profile_positions])
+
+    if profile_positions and "position_profile" in df.columns:
+        # Position profiles - filter by position_profile column
+        dmcm_mask = category_mask(df["position_profile"], profile_positions)
+        # Workaround: require sufficient minutes played in DM/CM (position_minutes) for profile rows
+        if dmcm_min_position_minutes and ("position_minutes" in df.columns):
+            dmcm_mask &= df["position_minutes"].fillna(0).to_numpy() >= float(dmcm_min_position_minutes)
+        position_mask |= dmcm_mask
+
+    # Competition/season/age part is shared with the player search pool
+    ages = df["age"].to_numpy()
+    base_mask = (
+        category_mask(df["competition_name"], competitions)
+        & category_mask(df["season_name"], seasons)
+        & (ages >= age_range[0]) & (ages <= age_range[1])
+    )
+    mask = base_mask & position_mask
+
+    if european_only and 'european' in df.columns:
+        mask &= df["european"].to_numpy()
+
+    return np.flatnonzero(mask), np.flatnonzero(base_mask)
+
+
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def filter_players(_df: pd.DataFrame, data_key: str, competitions: tuple, seasons: tuple, age_range: tuple,
+                   positions: tuple, dmcm_min_position_minutes: float, european_only: bool, top_n: int,
+                   min_scores: tuple) -> tuple:
+    """(top-N table rows, player search pool) for the current filters.
+
+    `_df` is not hashed; `data_key` is the load token of the shared player frame, so reruns that leave the filters
+    unchanged are answered from the cache instead of re-masking and re-ranking.
+    """
+    df = _df
+    rows, base_rows = filter_rows(df, data_key, competitions, seasons, age_range, positions,
+                                  dmcm_min_position_minutes, european_only)
+
+    # Score minimums narrow the ranked population, so the table still holds up to top_n players
+    min_physical, min_attack, min_defense = min_scores
+    rows = rows[
+        (df["physical"].to_numpy()[rows] >= min_physical) &
+        (df["attack"].to_numpy()[rows] >= min_attack) &
+        (df["defense"].to_numpy()[rows] >= min_defense)
+    ]
+
+    # Top-N by total: partition in O(n), then sort only the selected rows (NaN totals rank last)
+    order_key = -np.nan_to_num(df["total"].to_numpy(dtype=float)[rows], nan=-np.inf)
+    k = min(int(top_n), len(order_key))
+    top_idx = np.argpartition(order_key, k - 1)[:k] if k < len(order_key) else np.arange(k)
+    top_idx = top_idx[np.argsort(order_key[top_idx], kind="stable")]
+
+    # take() returns a new frame that is not flagged as a slice, so no defensive copy before adding a column
+    df_top = df.take(rows[top_idx])
+    df_top["original_rank"] = np.arange(1, k + 1)
+
+    return df_top, df.iloc[base_rows]
+
+
+@st.cache_resource(ttl=3600)
+def filter_options(_df: pd.DataFrame, data_key: str) -> tuple:
+    """(competitions, seasons, positions) offered in the sidebar; they only change when the data is reloaded"""
+    competitions = sorted(_df["competition_name"].dropna().unique())
+    seasons = sorted(_df["season_name"].dropna().unique())
+
+    # Build position list that includes position profiles for DM/CM
+    positions = []
+    for pos in sorted(_df["position"].dropna().unique()):
+        if pos == "DM/CM":
+            # For DM/CM, add the specific profiles instead of generic position
+            if 'position_profile' in _df.columns:
+                profiles = _df[_df["position"] == "DM/CM"]["position_profile"].dropna().unique()
+                dm_cm_profiles = sorted([p for p in profiles if p and p.startswith("DM/CM")])
+                if len(dm_cm_profiles) > 0:
+                    # Add the specific profiles
+                    positions.extend(dm_cm_profiles)
+                else:
+                    # Fallback: no profiles exist yet, add generic DM/CM
+                    positions.append(pos)
+            else:
+                positions.append(pos)
+        else:
+            positions.append(pos)
+
+    return competitions, seasons, positions
+
+
+@st.cache_resource(ttl=3600, max_entries=64, show_spinner=False)
+def search_player_names(_df_search_pool: pd.DataFrame, data_key: str, competitions: tuple, seasons: tuple,
+                        age_range: tuple) -> list:
+    """Sorted player names for the search box; the pool only depends on the competition/season/age filters.
+
+    A shared (resource) list: the multiselect only reads it, so reruns skip unpickling thousands of names.
+    """
+    # factorize hashes the names once and sorts only the distinct ones
+    return pd.factorize(_df_search_pool["player_name"], sort=True)[1].tolist()
+
+
+@st.cache_resource(ttl=3600)
+def player_row_labels(_df: pd.DataFrame, data_key: str) -> dict:
+    """{player_name: index labels of that player's rows, in frame order} for the shared player frame"""
+    return _df.groupby("player_name", sort=False, observed=True).groups
 
 
 def percentile_0_100(series: pd.Series) -> pd.Series:
-    s = series.copy()
-    if s.notna().sum() == 0:
-        return pd.Series([np.nan] * len(s), index=s.index)
-    if s.nunique(dropna=True) <= 1:
-        return pd.Series([50.0] * len(s), index=s.index)
-    return s.rank(pct=True) * 100.0
+    """Average-rank percentile (same as rank(pct=True) * 100) from a single NumPy sort of the non-NaN values"""
+    values = series.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    out = np.full(len(values), np.nan)
+
+    # np.unique sorts once and gives each value's tie group and the group sizes
+    uniques, inverse, counts = np.unique(values[valid], return_inverse=True, return_counts=True)
+    if len(uniques) == 0:
+        return pd.Series(out, index=series.index)
+    if len(uniques) == 1:
+        return pd.Series(np.full(len(values), 50.0), index=series.index)
+
+    # Ties share the mean of their 1-based rank span: (values below) + (group size + 1) / 2
+    below = np.cumsum(counts) - counts
+    out[valid] = (below[inverse] + (counts[inverse] + 1) / 2) / valid.sum() * 100.0
+    return pd.Series(out, index=series.index)
 
 
 def get_relevant_metrics_for_position(row: pd.Series, cohort: pd.DataFrame) -> dict:
@@ -513,6 +776,16 @@ def get_relevant_metrics_for_position(row: pd.Series, cohort: pd.DataFrame) -> d
     return {'physical': physical, 'attack': attack, 'defense': defense}
 
 
+# Closed (first label repeated) radar theta per metric group, built once
+_RADAR_THETA = {
+    tuple(metrics): [LABELS.get(m, m).replace('\n', ' ') for m in metrics + metrics[:1]]
+    for metrics in (
+        PHYSICAL_METRICS, ATTACK_METRICS, DEFENSE_METRICS,
+        DMCM_PROFILE_PHYSICAL_METRICS, DMCM_PROFILE_ATTACK_METRICS, DMCM_PROFILE_DEFENSE_METRICS,
+    )
+}
+
+
 def build_radar_3_shapes(row: pd.Series, cohort: pd.DataFrame) -> go.Figure:
     fig = go.Figure()
     relevant_metrics = get_relevant_metrics_for_position(row, cohort)
@@ -521,17 +794,13 @@ def build_radar_3_shapes(row: pd.Series, cohort: pd.DataFrame) -> go.Figure:
         if not metrics:
             return
 
-        r_vals, theta = [], []
-        for m in metrics:
-            r_vals.append(float(row[m]) if m in row.index and pd.notna(row[m]) else 0)
-            theta.append(LABELS.get(m, m).replace('\n', ' '))
-
-        r_vals = r_vals + [r_vals[0]]
-        theta  = theta + [theta[0]]
+        # One reindex for the whole group; missing or NaN metrics plot as 0
+        r_vals = np.nan_to_num(pd.to_numeric(row.reindex(metrics), errors="coerce").to_numpy(dtype=float), nan=0.0)
+        r_vals = np.append(r_vals, r_vals[0])
 
         fig.add_trace(go.Scatterpolar(
             r=r_vals,
-            theta=theta,
+            theta=_RADAR_THETA[tuple(metrics)],
             fill='toself',
             fillcolor=fill_rgba,
             line=dict(color=line_color, width=2),
@@ -556,111 +825,171 @@ def build_radar_3_shapes(row: pd.Series, cohort: pd.DataFrame) -> go.Figure:
     return fig
 
 
-@st.cache_data
-def get_team_logo_base64(team_name: str, competition_name: str = None) -> str:
+def sanitize_filename(name: str) -> str:
+    return (
+        name.replace(" ", "_")
+        .replace("/", "_")
+        .replace("\\", "_")
+        .replace(":", "_")
+        .replace("*", "_")
+        .replace("?", "_")
+        .replace('"', "_")
+        .replace("<", "_")
+        .replace(">", "_")
+        .replace("|", "_")
+    )
+
+
+def sanitize_competition_folder(name: str) -> str:
+    return name.replace("/", "_").replace("\\", "_")
+
+
+def _slug_to_team(slug: str) -> str:
+    """Turn a logo file stem (e.g. 'FC_Hansa_Rostock') back into a team name."""
+    return slug.replace("_", " ")
+
+
+# TEAM_LOGO_MAPPING with its targets already in logo-index key form (sanitized, lowercased), built once at import
+_SANITIZED_LOGO_MAP = {team: _slug_to_team(sanitize_filename(logo)).lower() for team, logo in TEAM_LOGO_MAPPING.items()}
+
+
+@st.cache_resource
+def _team_logo_index() -> dict:
+    """Scan TEAM_LOGOS_DIR once: {competition folder ('' for the root): {lowercased team name: logo path}}.
+
+    The logos ship with the app, so new ones arrive with a deploy (a fresh process) and are picked up then.
+    """
+    index = {}
+    if not os.path.isdir(TEAM_LOGOS_DIR):
+        return index
+
+    for entry in os.scandir(TEAM_LOGOS_DIR):
+        if entry.is_dir():
+            index[entry.name] = {
+                _slug_to_team(f.name[:-4]).lower(): f.path
+                for f in os.scandir(entry.path) if f.name.endswith(".png")
+            }
+        elif entry.name.endswith(".png"):
+            index.setdefault("", {})[_slug_to_team(entry.name[:-4]).lower()] = entry.path
+
+    return index
+
+
+@lru_cache(maxsize=None)
+def resolve_team_logo_path(team_name: str, competition_name: str = None) -> str:
+    """Logo file for a team, looked up in the pre-built logo index (competition folder first, then general).
+
+    Memoized in-process (plain dict hit, no argument hashing or result pickling) and warmed for every
+    team/competition pair when the player data is loaded.
+    """
     if not team_name:
         return None
 
-    try:
-        logo_filename = TEAM_LOGO_MAPPING.get(team_name, team_name)
-
-        def sanitize_filename(name):
-            return (
-                name.replace(" ", "_")
-                .replace("/", "_")
-                .replace("\\", "_")
-                .replace(":", "_")
-                .replace("*", "_")
-                .replace("?", "_")
-                .replace('"', "_")
-                .replace("<", "_")
-                .replace(">", "_")
-                .replace("|", "_")
-            )
-
-        def sanitize_competition_folder(name):
-            return name.replace("/", "_").replace("\\", "_")
-
-        safe_filename = sanitize_filename(logo_filename)
-
-        paths_to_try = []
-
-        if competition_name:
-            safe_comp = sanitize_competition_folder(competition_name)
-            comp_folder = Path(TEAM_LOGOS_DIR) / safe_comp
-            paths_to_try.append(comp_folder / f"{safe_filename}.png")
-
-            if logo_filename != team_name:
-                paths_to_try.append(comp_folder / f"{sanitize_filename(team_name)}.png")
-
-        paths_to_try.append(Path(TEAM_LOGOS_DIR) / f"{safe_filename}.png")
-
-        if logo_filename != team_name:
-            paths_to_try.append(Path(TEAM_LOGOS_DIR) / f"{sanitize_filename(team_name)}.png")
-
-        if competition_name:
-            safe_comp = sanitize_competition_folder(competition_name)
-            comp_folder = Path(TEAM_LOGOS_DIR) / safe_comp
-            if comp_folder.exists():
-                for file in comp_folder.glob("*.png"):
-                    if safe_filename.lower() in file.stem.lower():
-                        paths_to_try.insert(0, file)
-
-        for logo_path in paths_to_try:
-            if logo_path.exists():
-                img = Image.open(logo_path)
-                buffered = BytesIO()
-                img.save(buffered, format="PNG")
-                img_str = base64.b64encode(buffered.getvalue()).decode()
-                return f"data:image/png;base64,{img_str}"
+    logo_index = _team_logo_index()
+
+    # Compare on the sanitized, lowercased name so every candidate is a single dict probe (no stat calls)
+    team_key = _slug_to_team(sanitize_filename(team_name)).lower()
+    mapped_key = _SANITIZED_LOGO_MAP.get(team_name)
+    names_to_try = [mapped_key, team_key] if mapped_key else [team_key]
+
+    comp_logos = logo_index.get(sanitize_competition_folder(competition_name), {}) if competition_name else {}
+    general_logos = logo_index.get("", {})
+
+    for logos in (comp_logos, general_logos):
+        logo_path = next((logos[n] for n in names_to_try if n in logos), None)
+        if logo_path:
+            return logo_path
+
+    # Fuzzy match within the competition folder (e.g. "Ajax" -> "AFC Ajax")
+    needle = names_to_try[0]
+    return next((p for name, p in comp_logos.items() if needle in name), None)
+
+
+@st.cache_resource(show_spinner=False)
+def _png_data_uri(png_path: str) -> str:
+    """base64 data URI of a PNG file, encoded once per file and shared by every team/competition pointing at it.
+
+    The files are already PNG, so the raw bytes are embedded as-is (no PIL decode/re-encode).
+    """
+    img_str = base64.b64encode(Path(png_path).read_bytes()).decode()
+    return f"data:image/png;base64,{img_str}"
 
+
+@lru_cache(maxsize=None)
+def get_team_logo_base64(team_name: str, competition_name: str = None) -> str:
+    """Logo data URI for a team, memoized per (team, competition) so grids and captions do a single dict hit"""
+    try:
+        logo_path = resolve_team_logo_path(team_name, competition_name)
+        if logo_path:
+            return _png_data_uri(logo_path)
     except Exception:
         pass
 
     return None
 
 
+def team_logo_keys(frame: pd.DataFrame) -> tuple:
+    """Per-row logo key plus {key: data URI} for each distinct team/competition pair in `frame`.
+
+    The grids ship every logo once through gridOptions['context'] and TeamLogoRenderer looks it up by
+    key, instead of repeating the base64 image in every row's Team cell.
+    """
+    keys = frame["team_name"].astype(str) + "|" + frame["competition_name"].astype(object).fillna("").astype(str)
+    codes, _ = pd.factorize(keys)
+    first_rows = frame.iloc[np.unique(codes, return_index=True)[1]]
+
+    logos = {}
+    for code, (team, competition) in enumerate(zip(first_rows["team_name"], first_rows["competition_name"])):
+        logo_b64 = get_team_logo_base64(team, competition if pd.notna(competition) else None)
+        if logo_b64:
+            logos[str(code)] = logo_b64
+
+    return pd.Series(codes, index=frame.index), logos
+
+
+def display_positions(frame: pd.DataFrame) -> np.ndarray:
+    """position_profile where it is set (non-empty), otherwise position (vectorized)"""
+    positions = frame["position"].astype(object).to_numpy()
+    if "position_profile" not in frame.columns:
+        return positions
+    profiles = frame["position_profile"].astype(object).to_numpy()
+    has_profile = frame["position_profile"].notna().to_numpy() & (profiles != "")
+    return np.where(has_profile, profiles, positions)
+
+
 def get_team_fbref_google_search(team_name: str) -> str:
     query = f"{team_name} site:fbref.com"
     return f"https://www.google.com/search?q={query.replace(' ', '+')}"
 
 
+def player_urls(frame: pd.DataFrame) -> np.ndarray:
+    """Impect profile URL per row, falling back to the team's fbref Google search (vectorized)"""
+    # One search URL per distinct team, spread over the rows by factorize code
+    codes, teams = pd.factorize(frame["team_name"], use_na_sentinel=False)
+    fallback = np.array([get_team_fbref_google_search(str(t)) for t in teams], dtype=object)[codes]
+    if "impect_url" not in frame.columns:
+        return fallback
+    impect = frame["impect_url"]
+    return np.where((impect.notna() & (impect != "")).to_numpy(), impect.to_numpy(), fallback)
+
+
 # =========================
 # LOAD DATA
 # =========================
 with st.spinner('Loading player data...'):
-    df = load_data_from_supabase()
-
-with st.spinner('Loading player profiles...'):
-    df_impect_urls = load_impect_urls_from_supabase()
-
-if not df_impect_urls.empty:
-    # Deduplicate: keep one URL per player/iteration/position to avoid row multiplication on merge
-    df_impect_urls_deduped = (
-        df_impect_urls[['player_id', 'iterationid', 'position', 'impect_url']]
-        .dropna(subset=['impect_url'])
-        .drop_duplicates(subset=['player_id', 'iterationid', 'position'], keep='first')
-    )
-    df = df.merge(
-        df_impect_urls_deduped,
-        on=['player_id', 'iterationid', 'position'],
-        how='left'
-    )
+    df, data_key = load_player_frame()
 
 # =========================
 # SIDEBAR & FILTERS
 # =========================
 with st.sidebar:
     try:
-        logo = Image.open("FC_Groningen.png")
-        buffered = BytesIO()
-        logo.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
+        logo_uri = _png_data_uri("FC_Groningen.png")
 
         st.markdown(
             f"""
             <div style="margin: 0; padding: 0 0 4px 0; line-height: 0; text-align: center;">
-                <img src="data:image/png;base64,{img_str}"
+                <img src="{logo_uri}"
                      style="width: 140px; height: auto; display: inline-block; margin: 0; padding: 0;
                             image-rendering: -webkit-optimize-contrast; image-rendering: crisp-edges;" />
             </div>
@@ -675,27 +1004,7 @@ with st.sidebar:
 
 st.title("FC Groningen Scouting Dashboard")
 
-competitions = sorted(df["competition_name"].dropna().unique())
-seasons = sorted(df["season_name"].dropna().unique())
-
-# Build position list that includes position profiles for DM/CM
-positions = []
-for pos in sorted(df["position"].dropna().unique()):
-    if pos == "DM/CM":
-        # For DM/CM, add the specific profiles instead of generic position
-        if 'position_profile' in df.columns:
-            profiles = df[df["position"] == "DM/CM"]["position_profile"].dropna().unique()
-            dm_cm_profiles = sorted([p for p in profiles if p and p.startswith("DM/CM")])
-            if len(dm_cm_profiles) > 0:
-                # Add the specific profiles
-                positions.extend(dm_cm_profiles)
-            else:
-                # Fallback: no profiles exist yet, add generic DM/CM
-                positions.append(pos)
-        else:
-            positions.append(pos)
-    else:
-        positions.append(pos)
+competitions, seasons, positions = filter_options(df, data_key)
 
 default_competitions = ["Eredivisie"] if "Eredivisie" in competitions else competitions
 default_seasons = ["2025/2026"] if "2025/2026" in seasons else seasons
@@ -753,62 +1062,17 @@ with col3:
 with col4:
     min_defense = st.slider("Defense minimum", min_value=0, max_value=100, value=0, step=1)
 
-# Build position filter that handles both regular positions and profiles
-position_mask = pd.Series([False] * len(df), index=df.index)
-
-for selected in selected_pos:
-    if selected.startswith("DM/CM ("):
-        # This is a position profile - filter by position_profile column
-        if "position_profile" in df.columns:
-            dmcm_mask = (df["position_profile"] == selected)
-            # Workaround: require sufficient minutes played in DM/CM (position_minutes) for profile rows
-            if DMCM_PROFILE_MIN_POSITION_MINUTES and ("position_minutes" in df.columns):
-                dmcm_mask &= (df["position_minutes"].fillna(0) >= float(DMCM_PROFILE_MIN_POSITION_MINUTES))
-            position_mask |= dmcm_mask
-
-    else:
-        # Regular position - filter by position column
-        position_mask |= (df["position"] == selected)
-
-mask = (
-    df["competition_name"].isin(selected_comp)
-    & df["season_name"].isin(selected_season)
-    & df["age"].between(age_range[0], age_range[1])
-    & position_mask
+df_top, df_search_pool = filter_players(
+    df, data_key, tuple(selected_comp), tuple(selected_season), tuple(age_range), tuple(selected_pos),
+    DMCM_PROFILE_MIN_POSITION_MINUTES, show_european_only, int(top_n), (min_physical, min_attack, min_defense)
 )
 
-if show_european_only and 'european' in df.columns:
-    mask = mask & (df["european"] == True)
-
-df_f = df.loc[mask].copy()
-df_f.sort_values("total", ascending=False, inplace=True, na_position="last")
-df_f["original_rank"] = range(1, len(df_f) + 1)
-df_top = df_f.head(int(top_n)).copy()
-
-df_top = df_top[
-    (df_top["physical"] >= min_physical) &
-    (df_top["attack"] >= min_attack) &
-    (df_top["defense"] >= min_defense)
-]
-
-df_f = df_f[
-    (df_f["physical"] >= min_physical) &
-    (df_f["attack"] >= min_attack) &
-    (df_f["defense"] >= min_defense)
-]
-
 if len(df_top) == 0:
     st.info("No players match the current filters.")
     st.stop()
 
 # Add display_position column that shows position_profile when available
-if 'position_profile' in df_top.columns:
-    df_top['display_position'] = df_top.apply(
-        lambda row: row['position_profile'] if pd.notna(row.get('position_profile')) and row.get('position_profile') else row['position'],
-        axis=1
-    )
-else:
-    df_top['display_position'] = df_top['position']
+df_top['display_position'] = display_positions(df_top)
 
 st.subheader("Top Players Table")
 
@@ -820,38 +1084,24 @@ df_show = df_top[cols_to_copy].copy()
 
 df_show['_original_index'] = df_top.index
 
+# Round in float64: rounded float32 values would serialize with trailing digits in the grid (71.3 -> 71.30000305)
 numeric_display_cols = ["age", "total_minutes", "physical", "attack", "defense", "total"]
 for col in numeric_display_cols:
     if col in df_show.columns:
         if col == "total_minutes":
-            df_show[col] = df_show[col].round(0)
+            df_show[col] = df_show[col].astype(np.float64).round(0)
         else:
-            df_show[col] = df_show[col].round(1)
-
-def get_player_url(row):
-    if pd.notna(row.get('impect_url')) and row.get('impect_url'):
-        return row['impect_url']
-    else:
-        return get_team_fbref_google_search(row['team_name'])
+            df_show[col] = df_show[col].astype(np.float64).round(1)
 
-df_show["player_url"] = df_show.apply(get_player_url, axis=1)
+df_show["player_url"] = player_urls(df_show)
 
-def create_team_html_with_logo(row):
-    team_name = row['team_name']
-    competition = row.get('competition_name')
-    logo_b64 = get_team_logo_base64(team_name, competition)
-    if logo_b64:
-        return f'<img src="{logo_b64}" height="20" style="vertical-align: middle; margin-right: 8px;">{team_name}'
-    return team_name
+df_show["logo_key"], team_logos = team_logo_keys(df_show)
 
-df_show["team_with_logo_html"] = df_show.apply(create_team_html_with_logo, axis=1)
+cols_order = ["original_rank"] + table_cols
+df_show = df_show[cols_order + ["player_url", "logo_key", "_original_index"]]
 
-cols_order = ["original_rank", "player_name", "team_with_logo_html"] + [c for c in table_cols if c not in ["player_name", "team_name"]]
-df_show = df_show[cols_order + ["player_url", "_original_index"]]
-
-rename_dict = {k: v for k, v in DISPLAY_COLS.items() if k != "team_name"}
+rename_dict = dict(DISPLAY_COLS)
 rename_dict["original_rank"] = "#"
-rename_dict["team_with_logo_html"] = "Team"
 df_show = df_show.rename(columns=rename_dict)
 
 player_link_renderer = JsCode("""
@@ -874,7 +1124,17 @@ team_logo_renderer = JsCode("""
 class TeamLogoRenderer {
     init(params) {
         this.eGui = document.createElement('div');
-        this.eGui.innerHTML = params.value;
+        const logos = (params.context && params.context.logos) || {};
+        const logo = logos[params.data.logo_key];
+        if (logo) {
+            const img = document.createElement('img');
+            img.src = logo;
+            img.height = 20;
+            img.style.verticalAlign = 'middle';
+            img.style.marginRight = '8px';
+            this.eGui.appendChild(img);
+        }
+        this.eGui.appendChild(document.createTextNode(params.value));
     }
     getGui() {
         return this.eGui;
@@ -882,283 +1142,12 @@ class TeamLogoRenderer {
 }
 """)
 
-gb = GridOptionsBuilder.from_dataframe(df_show)
-gb.configure_column("#", width=70, pinned="left", sortable=True, type=["numericColumn"])
-gb.configure_column("Player Name", width=180, pinned="left", cellRenderer=player_link_renderer)
-gb.configure_column("Team", width=200, cellRenderer=team_logo_renderer)
-gb.configure_column("Nationality", width=110)
-gb.configure_column("Age", width=80, type=["numericColumn"], sortable=True)
-gb.configure_column("Position", width=130)  # Increased width for position profiles
-gb.configure_column("Minutes", width=100, type=["numericColumn"], sortable=True)
-gb.configure_column("Competition", width=110)
-gb.configure_column("Season", width=110)
-gb.configure_column("Physical", width=100, type=["numericColumn"], sortable=True)
-gb.configure_column("Attack", width=100, type=["numericColumn"], sortable=True)
-gb.configure_column("Defense", width=100, type=["numericColumn"], sortable=True)
-gb.configure_column("Total", width=100, type=["numericColumn"], sortable=True)
-
-gb.configure_column("player_url", hide=True)
-gb.configure_column("_original_index", hide=True)
-gb.configure_default_column(sortable=True, filterable=False, resizable=True)
-gb.configure_selection(selection_mode='multiple', use_checkbox=True, pre_selected_rows=[])
-
-gridOptions = gb.build()
-
-grid_response = AgGrid(
-    df_show,
-    gridOptions=gridOptions,
-    enable_enterprise_modules=False,
-    allow_unsafe_jscode=True,
-    update_mode=GridUpdateMode.SELECTION_CHANGED,
-    height=450,
-    fit_columns_on_grid_load=False,
-    theme='streamlit'
-)
-
-selected_from_grid = []
-selected_from_grid_full_data = []
-if grid_response and 'selected_rows' in grid_response:
-    selected_rows = grid_response['selected_rows']
-    if selected_rows is not None and len(selected_rows) > 0:
-        if isinstance(selected_rows, pd.DataFrame):
-            selected_from_grid = selected_rows['Player Name'].tolist()[:2]
-            for _, row_dict in selected_rows.iterrows():
-                if len(selected_from_grid_full_data) >= 2:
-                    break
-                if '_original_index' in row_dict.index:
-                    orig_idx = row_dict['_original_index']
-                    if orig_idx in df_top.index:
-                        selected_from_grid_full_data.append(df_top.loc[orig_idx])
-                        continue
-                import re
-                player_name = row_dict['Player Name']
-                team_name = row_dict['Team']
-                if isinstance(team_name, str) and '<img' in team_name:
-                    match = re.search(r'margin-right: 8px;">(.+?)(?:<|$)', team_name)
-                    if match:
-                        team_name = match.group(1).strip()
-                position = row_dict['Position']
-                competition = row_dict['Competition']
-                season = row_dict['Season']
-                matched_row = df_top[
-                    (df_top['player_name'] == player_name) &
-                    (df_top['team_name'] == team_name) &
-                    (df_top['display_position'] == position) &  # Use display_position for matching
-                    (df_top['competition_name'] == competition) &
-                    (df_top['season_name'] == season)
-                ]
-                if not matched_row.empty:
-                    selected_from_grid_full_data.append(matched_row.iloc[0])
-        elif isinstance(selected_rows, list) and len(selected_rows) > 0:
-            if isinstance(selected_rows[0], dict):
-                selected_from_grid = [row['Player Name'] for row in selected_rows[:2]]
-                for row_dict in selected_rows[:2]:
-                    if '_original_index' in row_dict:
-                        orig_idx = row_dict['_original_index']
-                        if orig_idx in df_top.index:
-                            selected_from_grid_full_data.append(df_top.loc[orig_idx])
-                            continue
-                    import re
-                    player_name = row_dict.get('Player Name')
-                    team_name = row_dict.get('Team', '')
-                    if isinstance(team_name, str) and '<img' in team_name:
-                        match = re.search(r'margin-right: 8px;">(.+?)(?:<|$)', team_name)
-                        if match:
-                            team_name = match.group(1).strip()
-                    position = row_dict.get('Position')
-                    competition = row_dict.get('Competition')
-                    season = row_dict.get('Season')
-                    matched_row = df_top[
-                        (df_top['player_name'] == player_name) &
-                        (df_top['team_name'] == team_name.strip()) &
-                        (df_top['display_position'] == position) &  # Use display_position for matching
-                        (df_top['competition_name'] == competition) &
-                        (df_top['season_name'] == season)
-                    ]
-                    if not matched_row.empty:
-                        selected_from_grid_full_data.append(matched_row.iloc[0])
-            else:
-                selected_from_grid = selected_rows[:2]
-
-# ========================================
-# DEFINE SEARCH POOL
-# ========================================
-mask_search = (
-    df["competition_name"].isin(selected_comp)
-    & df["season_name"].isin(selected_season)
-    & df["age"].between(age_range[0], age_range[1])
-)
-df_search_pool = df.loc[mask_search].copy()
-
-st.markdown("---")
-comparison_placeholder = st.empty()
-
 # ========================================
-# PLAYER SEARCH (Bottom Table)
+# PLAYER TABLES & COMPARISON
 # ========================================
-st.markdown("---")
-st.subheader("Player Search")
-st.markdown("Search for specific players to compare their performance across different positions and seasons.")
-
-available_players = sorted(df_search_pool["player_name"].unique().tolist())
-
-search_selected_players = st.multiselect(
-    "Search and select players",
-    options=available_players,
-    default=[],
-    help="Type to search and select multiple players. Search is independent of position and minimum score filters."
-)
-
-selected_from_bottom_table = []
-selected_from_bottom_table_full_data = []
-
-if search_selected_players:
-    search_df = df_search_pool[df_search_pool["player_name"].isin(search_selected_players)].copy()
-    
-    # Add display_position for search results
-    if 'position_profile' in search_df.columns:
-        search_df['display_position'] = search_df.apply(
-            lambda row: row['position_profile'] if pd.notna(row.get('position_profile')) and row.get('position_profile') else row['position'],
-            axis=1
-        )
-    else:
-        search_df['display_position'] = search_df['position']
-
-    search_cols = ["player_name", "team_name", "display_position", "competition_name", "season_name", "total_minutes",
-                   "physical", "attack", "defense", "total"]
-    if 'impect_url' in search_df.columns:
-        search_cols.append('impect_url')
-
-    search_display = search_df[search_cols].copy()
-    
-    # Store original index to match back to full data later
-    search_display['_search_original_index'] = search_df.index
-
-    for col in ["total_minutes", "physical", "attack", "defense", "total"]:
-        if col in search_display.columns:
-            if col == "total_minutes":
-                search_display[col] = search_display[col].round(0)
-            else:
-                search_display[col] = search_display[col].round(1)
-
-    search_display = search_display.sort_values(["player_name", "total"], ascending=[True, False])
-
-    def create_search_team_html(row):
-        team_name = row['team_name']
-        competition = row.get('competition_name')
-        logo_b64 = get_team_logo_base64(team_name, competition)
-        if logo_b64:
-            return f'<img src="{logo_b64}" height="20" style="vertical-align: middle; margin-right: 8px;">{team_name}'
-        return team_name
-
-    search_display["team_with_logo_html"] = search_display.apply(create_search_team_html, axis=1)
-
-    def get_search_player_url(row):
-        if 'impect_url' in row.index and pd.notna(row.get('impect_url')) and row.get('impect_url'):
-            return row['impect_url']
-        else:
-            return get_team_fbref_google_search(row['team_name'])
-
-    search_display["player_url"] = search_display.apply(get_search_player_url, axis=1)
-
-    display_cols = ["player_name", "team_with_logo_html", "display_position", "competition_name", "season_name",
-                    "total_minutes", "physical", "attack", "defense", "total"]
-    search_display = search_display[display_cols + ["player_url", "_search_original_index"]]
-
-    search_display = search_display.rename(columns={
-        "player_name": "Player Name",
-        "team_with_logo_html": "Team",
-        "display_position": "Position",
-        "competition_name": "Competition",
-        "season_name": "Season",
-        "total_minutes": "Minutes",
-        "physical": "Physical",
-        "attack": "Attack",
-        "defense": "Defense",
-        "total": "Total"
-    })
-
-    gb_search = GridOptionsBuilder.from_dataframe(search_display)
-    gb_search.configure_column("Player Name", width=180, pinned="left", cellRenderer=player_link_renderer)
-    gb_search.configure_column("Team", width=200, cellRenderer=team_logo_renderer)
-    gb_search.configure_column("Position", width=130)  # Increased width for position profiles
-    gb_search.configure_column("Competition", width=110)
-    gb_search.configure_column("Season", width=110)
-    gb_search.configure_column("Minutes", width=100, type=["numericColumn"], sortable=True)
-    gb_search.configure_column("Physical", width=100, type=["numericColumn"], sortable=True)
-    gb_search.configure_column("Attack", width=100, type=["numericColumn"], sortable=True)
-    gb_search.configure_column("Defense", width=100, type=["numericColumn"], sortable=True)
-    gb_search.configure_column("Total", width=100, type=["numericColumn"], sortable=True)
-    gb_search.configure_column("player_url", hide=True)
-    gb_search.configure_column("_search_original_index", hide=True)
-    gb_search.configure_default_column(sortable=True, filterable=False, resizable=True)
-    gb_search.configure_selection(selection_mode='multiple', use_checkbox=True, pre_selected_rows=[])
-
-    gridOptions_search = gb_search.build()
-
-    st.markdown(f"**Found {len(search_display)} record(s) for {len(search_selected_players)} player(s)**")
-    st.info("💡 **Tip:** Select up to 2 players using the checkboxes to view their comparison charts above.")
-
-    search_grid_response = AgGrid(
-        search_display,
-        gridOptions=gridOptions_search,
-        enable_enterprise_modules=False,
-        allow_unsafe_jscode=True,
-        update_mode=GridUpdateMode.SELECTION_CHANGED,
-        height=min(400, 50 + len(search_display) * 35),
-        fit_columns_on_grid_load=False,
-        theme='streamlit'
-    )
-
-    selected_from_bottom_table = []
-    selected_from_bottom_table_full_data = []
-    if search_grid_response and 'selected_rows' in search_grid_response:
-        search_selected_rows = search_grid_response['selected_rows']
-        if search_selected_rows is not None and len(search_selected_rows) > 0:
-            if isinstance(search_selected_rows, pd.DataFrame):
-                selected_from_bottom_table = search_selected_rows['Player Name'].tolist()[:2]
-                # Get full data using the original index
-                for idx in search_selected_rows['_search_original_index'].tolist()[:2]:
-                    if idx in search_df.index:
-                        selected_from_bottom_table_full_data.append(search_df.loc[idx])
-            elif isinstance(search_selected_rows, list) and len(search_selected_rows) > 0:
-                if isinstance(search_selected_rows[0], dict):
-                    selected_from_bottom_table = [row['Player Name'] for row in search_selected_rows[:2]]
-                    # Get full data using the original index
-                    for row in search_selected_rows[:2]:
-                        if '_search_original_index' in row:
-                            idx = row['_search_original_index']
-                            if idx in search_df.index:
-                                selected_from_bottom_table_full_data.append(search_df.loc[idx])
-                else:
-                    selected_from_bottom_table = search_selected_rows[:2]
-else:
-    st.info("Type player names above to search across all positions and seasons.")
-    selected_from_bottom_table = []
-    selected_from_bottom_table_full_data = []
-
-# ========================================
-# COMPARISON CHARTS
-# ========================================
-with comparison_placeholder.container():
-    st.subheader("Player Comparison Charts")
-
-    if selected_from_bottom_table:
-        players_to_compare = selected_from_bottom_table
-        players_data_to_compare = selected_from_bottom_table_full_data
-        source_message = "from search table below"
-        use_exact_data = len(selected_from_bottom_table_full_data) > 0
-    elif selected_from_grid and selected_from_grid_full_data:
-        players_to_compare = selected_from_grid
-        players_data_to_compare = selected_from_grid_full_data
-        source_message = "from top table"
-        use_exact_data = True
-    else:
-        players_to_compare = []
-        players_data_to_compare = []
-        source_message = ""
-        use_exact_data = False
-
+def render_comparison(players_to_compare: list, players_data_to_compare: list, source_message: str,
+                      use_exact_data: bool, df: pd.DataFrame, data_key: str, df_search_pool: pd.DataFrame):
+    """Caption and polarized bar chart per compared player (at most 2); the charts come from the chart cache."""
     if len(players_to_compare) > 0:
         if len(players_to_compare) > 2:
             st.warning("Please select at most 2 players for comparison.")
@@ -1167,37 +1156,26 @@ with comparison_placeholder.container():
 
         st.info(f"Comparing {len(players_to_compare)} player(s) selected {source_message}")
 
-        st.markdown("""
-        <style>
-        @keyframes fadeIn {
-            from { opacity: 0; transform: translateY(10px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
-        .stPlotlyChart {
-            animation: fadeIn 0.5s ease-in-out;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-
         cols = st.columns(2)
 
+        # Figures of the previous render, keyed by (data load, row label); an unchanged selection reuses them as-is
+        previous_charts = st.session_state.get("_comparison_charts", {})
+        current_charts = {}
+
         for i, player_name in enumerate(players_to_compare):
             if use_exact_data and i < len(players_data_to_compare):
                 player_data = players_data_to_compare[i]
             else:
-                player_rows = df_search_pool[df_search_pool["player_name"] == player_name]
-                if player_rows.empty:
-                    player_rows = df[df["player_name"] == player_name]
-                if player_rows.empty:
+                # Index lookup instead of scanning player_name; prefer the player's first row in the search pool
+                labels = player_row_labels(df, data_key).get(player_name)
+                if labels is None or len(labels) == 0:
                     st.warning(f"No data found for {player_name}")
                     continue
-                player_data = player_rows.iloc[0]
+                pool_labels = labels[df_search_pool.index.get_indexer(labels) >= 0]
+                player_data = df_search_pool.loc[pool_labels[0]] if len(pool_labels) else df.loc[labels[0]]
 
             with cols[i]:
-                st.markdown(
-                    f"<p style='font-size: 1.5rem; font-weight: 600; margin-bottom: 0.5rem;'>{player_name}</p>",
-                    unsafe_allow_html=True
-                )
+                st.markdown(COMPARISON_NAME_HTML.format(player_name), unsafe_allow_html=True)
 
                 team_name = player_data['team_name']
                 competition = player_data.get('competition_name')
@@ -1211,27 +1189,242 @@ with comparison_placeholder.container():
                     f"{int(player_data['total_minutes'])} mins"
                 ]
 
-                if team_logo_b64:
-                    caption_html = f"""
-                    <div style="font-size: 1.1rem; margin-bottom: 1rem; line-height: 1.6;">
-                        <img src="{team_logo_b64}" height="30" style="vertical-align: middle; margin-right: 8px;">
-                        {' · '.join(caption_parts)}
-                    </div>
-                    """
-                    st.markdown(caption_html, unsafe_allow_html=True)
-                else:
-                    st.markdown(
-                        f"<div style='font-size: 1.1rem; margin-bottom: 1rem;'>{' · '.join(caption_parts)}</div>",
-                        unsafe_allow_html=True
-                    )
-
-                fig = create_polarized_bar_chart(
-                    player_data,
-                    player_data['competition_name'],
-                    player_data['season_name']
+                st.markdown(
+                    COMPARISON_CAPTION_HTML.format(
+                        logo=TEAM_LOGO_IMG_HTML.format(team_logo_b64, 30) if team_logo_b64 else "",
+                        caption=" · ".join(caption_parts),
+                    ),
+                    unsafe_allow_html=True
                 )
+
+                chart_memo_key = (data_key, player_data.name)
+                fig = previous_charts.get(chart_memo_key)
+                if fig is None:
+                    fig = create_polarized_bar_chart(
+                        player_data,
+                        player_data['competition_name'],
+                        player_data['season_name']
+                    )
+                current_charts[chart_memo_key] = fig
                 # Add unique key to prevent duplicate element ID error
                 chart_key = f"comparison_chart_{i}_{player_name.replace(' ', '_')}"
                 st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False}, key=chart_key)
+
+        st.session_state["_comparison_charts"] = current_charts
     else:
         st.info("Select players from the top table or search table below (using checkboxes) to view comparison charts.")
+
+
+def top_grid_options(df_show: pd.DataFrame, team_logos: dict) -> dict:
+    """AgGrid options for the top table, built once per filter result instead of on every fragment rerun"""
+    gb = GridOptionsBuilder.from_dataframe(df_show)
+    gb.configure_column("#", width=70, pinned="left", sortable=True, type=["numericColumn"])
+    gb.configure_column("Player Name", width=180, pinned="left", cellRenderer=player_link_renderer)
+    gb.configure_column("Team", width=200, cellRenderer=team_logo_renderer)
+    gb.configure_column("Nationality", width=110)
+    gb.configure_column("Age", width=80, type=["numericColumn"], sortable=True)
+    gb.configure_column("Position", width=130)  # Increased width for position profiles
+    gb.configure_column("Minutes", width=100, type=["numericColumn"], sortable=True)
+    gb.configure_column("Competition", width=110)
+    gb.configure_column("Season", width=110)
+    gb.configure_column("Physical", width=100, type=["numericColumn"], sortable=True)
+    gb.configure_column("Attack", width=100, type=["numericColumn"], sortable=True)
+    gb.configure_column("Defense", width=100, type=["numericColumn"], sortable=True)
+    gb.configure_column("Total", width=100, type=["numericColumn"], sortable=True)
+
+    gb.configure_column("player_url", hide=True)
+    gb.configure_column("logo_key", hide=True)
+    gb.configure_column("_original_index", hide=True)
+    gb.configure_default_column(sortable=True, filterable=False, resizable=True)
+    gb.configure_selection(selection_mode='multiple', use_checkbox=True, pre_selected_rows=[])
+
+    gridOptions = gb.build()
+    gridOptions["context"] = {"logos": team_logos}
+    return gridOptions
+
+
+@st.fragment
+def render_player_tables(df: pd.DataFrame, data_key: str, df_top: pd.DataFrame, df_show: pd.DataFrame,
+                         gridOptions: dict, df_search_pool: pd.DataFrame, available_players: list):
+    """Grids, player search and comparison charts. Selecting rows only reruns this fragment, not the data load and filters."""
+    grid_response = AgGrid(
+        df_show,
+        gridOptions=gridOptions,
+        enable_enterprise_modules=False,
+        allow_unsafe_jscode=True,
+        update_mode=GridUpdateMode.SELECTION_CHANGED,
+        # Only the selected rows are read back, so the grid does not return its (filtered/sorted) row data
+        data_return_mode=DataReturnMode.AS_INPUT,
+        height=450,
+        fit_columns_on_grid_load=False,
+        theme='streamlit'
+    )
+
+    # Every grid row carries its df_top label in the hidden _original_index column
+    selected_from_grid = []
+    selected_from_grid_full_data = []
+    if grid_response and 'selected_rows' in grid_response:
+        selected_rows = grid_response['selected_rows']
+        if selected_rows is not None and len(selected_rows) > 0:
+            # Depending on the streamlit-aggrid version the selection is a DataFrame or a list of dicts
+            records = selected_rows.to_dict('records') if isinstance(selected_rows, pd.DataFrame) else selected_rows
+            if isinstance(records[0], dict):
+                selected_from_grid = [row['Player Name'] for row in records[:2]]
+                # One indexer call resolves both labels (-1 for any that is missing)
+                positions = df_top.index.get_indexer([row.get('_original_index') for row in records[:2]])
+                selected_from_grid_full_data = [df_top.iloc[pos] for pos in positions if pos >= 0]
+            else:
+                selected_from_grid = records[:2]
+
+    st.markdown("---")
+    comparison_placeholder = st.empty()
+
+    # ========================================
+    # PLAYER SEARCH (Bottom Table)
+    # ========================================
+    st.markdown("---")
+    st.subheader("Player Search")
+    st.markdown("Search for specific players to compare their performance across different positions and seasons.")
+
+    search_selected_players = st.multiselect(
+        "Search and select players",
+        options=available_players,
+        default=[],
+        help="Type to search and select multiple players. Search is independent of position and minimum score filters."
+    )
+
+    selected_from_bottom_table = []
+    selected_from_bottom_table_full_data = []
+
+    if search_selected_players:
+        # take() yields one fresh frame that columns can be added to (no boolean-index copy plus .copy())
+        search_df = df_search_pool.take(np.flatnonzero(category_mask(df_search_pool["player_name"], search_selected_players)))
+    
+        # Add display_position for search results
+        search_df['display_position'] = display_positions(search_df)
+
+        search_cols = ["player_name", "team_name", "display_position", "competition_name", "season_name", "total_minutes",
+                       "physical", "attack", "defense", "total"]
+        if 'impect_url' in search_df.columns:
+            search_cols.append('impect_url')
+
+        search_display = search_df.reindex(columns=search_cols)
+    
+        # Store original index to match back to full data later
+        search_display['_search_original_index'] = search_df.index
+
+        for col in ["total_minutes", "physical", "attack", "defense", "total"]:
+            if col in search_display.columns:
+                if col == "total_minutes":
+                    search_display[col] = search_display[col].astype(np.float64).round(0)
+                else:
+                    search_display[col] = search_display[col].astype(np.float64).round(1)
+
+        search_display = search_display.sort_values(["player_name", "total"], ascending=[True, False])
+
+        search_display["logo_key"], search_team_logos = team_logo_keys(search_display)
+
+        search_display["player_url"] = player_urls(search_display)
+
+        display_cols = ["player_name", "team_name", "display_position", "competition_name", "season_name",
+                        "total_minutes", "physical", "attack", "defense", "total"]
+        search_display = search_display[display_cols + ["player_url", "logo_key", "_search_original_index"]]
+
+        search_display = search_display.rename(columns={
+            "player_name": "Player Name",
+            "team_name": "Team",
+            "display_position": "Position",
+            "competition_name": "Competition",
+            "season_name": "Season",
+            "total_minutes": "Minutes",
+            "physical": "Physical",
+            "attack": "Attack",
+            "defense": "Defense",
+            "total": "Total"
+        })
+
+        gb_search = GridOptionsBuilder.from_dataframe(search_display)
+        gb_search.configure_column("Player Name", width=180, pinned="left", cellRenderer=player_link_renderer)
+        gb_search.configure_column("Team", width=200, cellRenderer=team_logo_renderer)
+        gb_search.configure_column("Position", width=130)  # Increased width for position profiles
+        gb_search.configure_column("Competition", width=110)
+        gb_search.configure_column("Season", width=110)
+        gb_search.configure_column("Minutes", width=100, type=["numericColumn"], sortable=True)
+        gb_search.configure_column("Physical", width=100, type=["numericColumn"], sortable=True)
+        gb_search.configure_column("Attack", width=100, type=["numericColumn"], sortable=True)
+        gb_search.configure_column("Defense", width=100, type=["numericColumn"], sortable=True)
+        gb_search.configure_column("Total", width=100, type=["numericColumn"], sortable=True)
+        gb_search.configure_column("player_url", hide=True)
+        gb_search.configure_column("logo_key", hide=True)
+        gb_search.configure_column("_search_original_index", hide=True)
+        gb_search.configure_default_column(sortable=True, filterable=False, resizable=True)
+        gb_search.configure_selection(selection_mode='multiple', use_checkbox=True, pre_selected_rows=[])
+
+        gridOptions_search = gb_search.build()
+        gridOptions_search["context"] = {"logos": search_team_logos}
+
+        st.markdown(f"**Found {len(search_display)} record(s) for {len(search_selected_players)} player(s)**")
+        st.info("💡 **Tip:** Select up to 2 players using the checkboxes to view their comparison charts above.")
+
+        search_grid_response = AgGrid(
+            search_display,
+            gridOptions=gridOptions_search,
+            enable_enterprise_modules=False,
+            allow_unsafe_jscode=True,
+            update_mode=GridUpdateMode.SELECTION_CHANGED,
+            data_return_mode=DataReturnMode.AS_INPUT,
+            height=min(400, 50 + len(search_display) * 35),
+            fit_columns_on_grid_load=False,
+            theme='streamlit'
+        )
+
+        selected_from_bottom_table = []
+        selected_from_bottom_table_full_data = []
+        if search_grid_response and 'selected_rows' in search_grid_response:
+            search_selected_rows = search_grid_response['selected_rows']
+            if search_selected_rows is not None and len(search_selected_rows) > 0:
+                search_records = (search_selected_rows.to_dict('records')
+                                  if isinstance(search_selected_rows, pd.DataFrame) else search_selected_rows)
+                if isinstance(search_records[0], dict):
+                    selected_from_bottom_table = [row['Player Name'] for row in search_records[:2]]
+                    # Get full data using the original index
+                    positions = search_df.index.get_indexer([row.get('_search_original_index') for row in search_records[:2]])
+                    selected_from_bottom_table_full_data = [search_df.iloc[pos] for pos in positions if pos >= 0]
+                else:
+                    selected_from_bottom_table = search_records[:2]
+    else:
+        st.info("Type player names above to search across all positions and seasons.")
+        selected_from_bottom_table = []
+        selected_from_bottom_table_full_data = []
+
+    # ========================================
+    # COMPARISON CHARTS
+    # ========================================
+    with comparison_placeholder.container():
+        st.subheader("Player Comparison Charts")
+
+        if selected_from_bottom_table:
+            players_to_compare = selected_from_bottom_table
+            players_data_to_compare = selected_from_bottom_table_full_data
+            source_message = "from search table below"
+            use_exact_data = len(selected_from_bottom_table_full_data) > 0
+        elif selected_from_grid and selected_from_grid_full_data:
+            players_to_compare = selected_from_grid
+            players_data_to_compare = selected_from_grid_full_data
+            source_message = "from top table"
+            use_exact_data = True
+        else:
+            players_to_compare = []
+            players_data_to_compare = []
+            source_message = ""
+            use_exact_data = False
+
+        render_comparison(players_to_compare, players_data_to_compare, source_message, use_exact_data,
+                          df, data_key, df_search_pool)
+
+
+available_players = search_player_names(
+    df_search_pool, data_key, tuple(selected_comp), tuple(selected_season), tuple(age_range)
+)
+
+render_player_tables(df, data_key, df_top, df_show, top_grid_options(df_show, team_logos), df_search_pool, available_players)
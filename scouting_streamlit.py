@@ -4,14 +4,17 @@ import base64
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+import pyarrow as pa
 import streamlit as st
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 from io import BytesIO
+from itertools import chain
 from pathlib import Path
 from PIL import Image
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode, JsCode
+from st_aggrid import AgGrid, DataReturnMode, GridOptionsBuilder, GridUpdateMode, JsCode
 from supabase import create_client, Client
 
 # 1. HELP FUNCTIONS
@@ -64,13 +67,63 @@ def validate_profiles(metrics, profiles):
     Returns an error message if a metric is not defined.
     """
 
-    for pos, keys in profiles.items():
-        for key in keys:
-            if key not in metrics:
-                raise KeyError(f"'{key}' in position '{pos}' is not defined.")
+    # Collect all undefined metrics with one set difference per position
+    undefined = {pos: sorted(set(keys) - metrics.keys()) for pos, keys in profiles.items()}
+    undefined = {pos: keys for pos, keys in undefined.items() if keys}
+
+    if undefined:
+        raise KeyError(f"Undefined metrics per position: {undefined}")
+
+# Create one Supabase client for the whole app
+@st.cache_resource
+def get_supabase():
+    """
+    Returns a shared Supabase client, so the HTTP connection pool is reused by all loaders.
+    """
+
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+# Fetch all rows of a Supabase table
+def fetch_all_rows(table, columns=None, page_size=1000):
+    """
+    Fetches all rows of a table, requesting the pages in parallel. Of the given columns only those in the table are requested.
+    """
+
+    supabase: Client = get_supabase()
+
+    # Count the rows so all page ranges are known up front, the single returned row shows which columns exist
+    count_response = supabase.table(table).select("*", count='exact').limit(1).execute()
+    total_count = count_response.count
+
+    # Optional columns (e.g. european) are not present in every table version, so leave out the missing ones
+    if columns is None:
+        selected_columns = "*"
+    else:
+        existing_columns = count_response.data[0].keys() if count_response.data else columns
+        selected_columns = ",".join(col for col in columns if col in existing_columns)
+
+    # Fetch a single page of rows
+    def fetch_page(offset):
+        return supabase.table(table).select(selected_columns).range(offset, offset + page_size - 1).execute().data
+
+    # Pages are network bound, so fetch them concurrently (map keeps them in offset order)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        return list(chain.from_iterable(executor.map(fetch_page, range(0, total_count, page_size))))
+
+# Convert fetched rows to a DataFrame
+def rows_to_dataframe(rows):
+    """
+    Builds a DataFrame from a list of row dicts, using PyArrow's columnar conversion when possible.
+    """
+
+    try:
+        return pa.Table.from_pylist(rows).to_pandas()
+
+    # Columns with mixed value types can't be converted by PyArrow, so use pandas for those
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pd.DataFrame(rows)
 
 # Function to load data stored in Supabase
-@st.cache_data(ttl=3600)
 def load_data_from_supabase():
     """
     Loads data stored in Supabase using url and key.
@@ -78,21 +131,15 @@ def load_data_from_supabase():
 
     try:
 
-        # Create Supabase client using the url and key
-        supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-        # Create pagination so all data can be fetched
-        count_response = supabase.table('player_percentiles').select("id", count='exact').limit(1).execute()
-        total_count = count_response.count
+        # Fetch all pages of the table, only requesting the columns used by the app
+        all_data = fetch_all_rows('player_percentiles', required_columns)
 
-        all_data = []
-        page_size = 1000
+        df = rows_to_dataframe(all_data)
 
-        for offset in range(0, total_count, page_size):
-            response = supabase.table('player_percentiles').select("*").range(offset, offset + page_size - 1).execute()
-            all_data.extend(response.data)
-
-        df = pd.DataFrame(all_data)
+        # Store the filter and search columns as categories, so masks and lookups compare integer codes instead of strings
+        for col in ["competition_name", "season_name", "position_profile", "team_name", "country", "player_name"]:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
 
         return df
 
@@ -103,7 +150,6 @@ def load_data_from_supabase():
         return pd.DataFrame()
 
 # Function to load stored player Impect urls in Supabase
-@st.cache_data(ttl=36000)
 def load_impect_urls_from_supabase():
     """
     Load Impect URLs from player_impect_urls table.
@@ -111,21 +157,10 @@ def load_impect_urls_from_supabase():
 
     try:
 
-        # Create Supabase client using the url and key
-        supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-        # Create pagination so all data can be fetched
-        count_response = supabase.table('player_impect_urls').select("id", count='exact').limit(1).execute()
-        total_count = count_response.count
-
-        all_urls = []
-        page_size = 1000
-
-        for offset in range(0, total_count, page_size):
-            response = supabase.table('player_impect_urls').select("player_id, player_name, iterationid, position, impect_url").range(offset, offset + page_size - 1).execute()
-            all_urls.extend(response.data)
+        # Fetch all pages of the table
+        all_urls = fetch_all_rows('player_impect_urls', ["player_id", "player_name", "iterationid", "position", "impect_url"])
 
-        df = pd.DataFrame(all_urls)
+        df = rows_to_dataframe(all_urls)
 
         return df
 
@@ -133,26 +168,120 @@ def load_impect_urls_from_supabase():
         st.warning(f"Could not load Impect URLs: {str(e)}")
         return pd.DataFrame()
 
+# Load the player data including the Impect urls
+@st.cache_resource(ttl=3600, show_spinner=False)
+def load_player_data():
+    """
+    Loads the player data, merges the Impect urls onto it and prepares its table frame and player index, cached together as one shared entry.
+    """
+
+    # Get percentile data and Impect urls
+    df_player_data = load_data_from_supabase()
+    df_impect_urls = load_impect_urls_from_supabase()
+
+    # Merge Impect url to the players data
+    if not df_impect_urls.empty:
+        # Create a unique lookup table from the URL data
+        url_lookup = df_impect_urls[['player_id', 'position', 'impect_url']].drop_duplicates(
+            subset=['player_id', 'position']
+        )
+
+        # Merge onto  main data
+        df_player_data = df_player_data.merge(
+            url_lookup,
+            on=['player_id', 'position'],
+            how='left'
+        )
+
+    # The table frame and player index are built in the same entry, so their rows always line up with the positions in the player data
+    player_rows = df_player_data.groupby("player_name", sort=False, observed=True).indices
+    return df_player_data, prepare_player_display_data(df_player_data), player_rows
+
+# Get the options of the dropdowns
+@st.cache_resource(ttl=3600, show_spinner=False)
+def get_dropdown_options():
+    """
+    Returns the sorted competitions, seasons and position profiles, and the age range of the player data.
+    """
+
+    df_player_data = load_player_data()[0]
+
+    # Find unique variables to show in the dropdowns
+    competitions = sorted(df_player_data["competition_name"].dropna().unique())
+    seasons = sorted(df_player_data["season_name"].dropna().unique())
+    raw_positions = df_player_data["position_profile"].dropna().unique()
+    positions = sorted(raw_positions, key=lambda x: custom_order.index(x) if x in custom_order else 999)
+
+    # Find the age range to show in the slider
+    ages = df_player_data["age"].to_numpy(dtype=float)
+    age_min, age_max = int(np.nanmin(ages)), int(np.nanmax(ages))
+
+    return competitions, seasons, positions, age_min, age_max
+
+# Get the names of all players for the search field
+@st.cache_resource(ttl=3600, show_spinner=False)
+def get_available_players():
+    """
+    Returns the sorted names of all players in the player data.
+    """
+
+    return sorted(load_player_data()[0]["player_name"].unique().tolist())
+
+# Prepare the columns shown in the player tables
+def prepare_player_display_data(df_player_data):
+    """
+    Returns the player data with rounded numbers and the url, team logo and cell color columns of the tables.
+    """
+
+    # Round numeric columns
+    df_display = df_player_data.round(round_decimals)
+
+    # Create dynamic url, team logo and cell color columns
+    df_display["player_url"] = player_url_column(df_display)
+    df_display["team_with_logo_html"] = team_html_with_logo_column(df_display)
+    df_display["_original_index"] = df_display.index
+    add_score_colors(df_display)
+
+    # Reorder and rename columns, the rank is added per table
+    table_keys = [key for key in table_columns if key != "original_rank"]
+    df_display = df_display.reindex(columns=table_keys + ["player_url", "_original_index"] + score_color_columns)
+
+    return df_display.rename(columns=table_columns)
+
 # Get the relevant metrics for a selected position
 def get_metrics_for_profile(profile_name):
     """"
     Find relevant metrics per category for a selected position.
     """
 
-    # Get the list of metric keys
-    metric_keys = position_profiles.get(profile_name, [])
-    
-    # Sort them into categories
-    categories = {cat.name.lower(): [] for cat in MetricCategory}
-    
-    for key in metric_keys:
-        if key in metrics:
-            metric_obj = metrics[key]
-            cat_name = metric_obj.category.name.lower()
-            if cat_name in categories:
-                categories[cat_name].append(key)
-            
-    return categories
+    # Take the keys from the precomputed decomposition of the profile
+    categories = profile_categories.get(profile_name, empty_profile_categories)
+
+    return {cat_name: [key for key, _ in items] for cat_name, items in categories.items()}
+
+# Layout of the player radars, shared by all radar figures
+RADAR_LAYOUT = dict(
+    polar=dict(
+        bgcolor="rgba(0,0,0,0)",
+        radialaxis=dict(
+            visible=True, 
+            range=[0, 100], 
+            tickfont=dict(size=10, color="gray"),
+            gridcolor="rgba(200, 200, 200, 0.2)"
+        ),
+        angularaxis=dict(
+            tickfont=dict(size=10, fontfamily="Arial Black"),
+            rotation=90,
+            direction="clockwise"
+        )
+    ),
+    showlegend=True,
+    legend=dict(orientation="h", yanchor="bottom", y=-0.2, xanchor="center", x=0.5),
+    height=500,
+    margin=dict(l=80, r=80, t=40, b=40),
+    paper_bgcolor="rgba(0,0,0,0)",
+    plot_bgcolor="rgba(0,0,0,0)",
+)
 
 # Create player radars
 def build_radar_3_shapes(row, profile_name):
@@ -163,36 +292,25 @@ def build_radar_3_shapes(row, profile_name):
     # Create figure
     fig = go.Figure()
 
-    # Get categorized metrics
-    categorized_metrics = get_metrics_for_profile(profile_name)
+    # Get categorized metrics with their chart labels
+    categorized_metrics = profile_categories.get(profile_name, empty_profile_categories)
 
     # 2. Internal helper to add each category shape
-    def add_group(metric_keys, name, line_color, fill_rgba):
+    def add_group(metric_items, name, line_color, fill_rgba):
         """"
         Internal helper to add each category shape.
         """
 
-        if not metric_keys:
+        if not metric_items:
             return
 
-        r_vals = []
-        theta = []
-
-        for m in metric_keys:
-            # Get value from row, default to 0 if NaN
-            val = row.get(m, 0)
-            r_vals.append(float(val) if pd.notna(val) else 0)
-            
-            # Get label from our Metric objects, remove newlines for the chart
-            if m in metrics:
-                display_label = metrics[m].label.replace('\n', ' ')
-            else:
-                display_label = m.replace('_', ' ').title()
-            
-            theta.append(display_label)
+        metric_keys, theta = map(list, zip(*metric_items))
+
+        # Get all values from row at once, default to 0 if missing or NaN
+        vals = np.nan_to_num(row.reindex(metric_keys).to_numpy(dtype=float))
 
         # Close the radar loop
-        r_vals.append(r_vals[0])
+        r_vals = np.append(vals, vals[0]).tolist()
         theta.append(theta[0])
 
         fig.add_trace(go.Scatterpolar(
@@ -216,49 +334,21 @@ def build_radar_3_shapes(row, profile_name):
         add_group(categorized_metrics.get(key, []), label, line_col, fill_col)
 
     # Final layout styling
-    fig.update_layout(
-        polar=dict(
-            bgcolor="rgba(0,0,0,0)",
-            radialaxis=dict(
-                visible=True, 
-                range=[0, 100], 
-                tickfont=dict(size=10, color="gray"),
-                gridcolor="rgba(200, 200, 200, 0.2)"
-            ),
-            angularaxis=dict(
-                tickfont=dict(size=10, fontfamily="Arial Black"),
-                rotation=90,
-                direction="clockwise"
-            )
-        ),
-        showlegend=True,
-        legend=dict(orientation="h", yanchor="bottom", y=-0.2, xanchor="center", x=0.5),
-        height=500,
-        margin=dict(l=80, r=80, t=40, b=40),
-        paper_bgcolor="rgba(0,0,0,0)",
-        plot_bgcolor="rgba(0,0,0,0)",
-    )
+    fig.update_layout(**RADAR_LAYOUT)
 
     return fig
 
+# Characters that can't be used in file names, and the separators that can't be used in folder names
+FILENAME_TRANSLATION = str.maketrans({char: "_" for char in ' /\\:*?"<>|'})
+FOLDERNAME_TRANSLATION = str.maketrans({char: "_" for char in '/\\'})
+
 # Function to clean teamnames based on how they can be saved
 def sanitize_filename(name):
     """"
     Clean team names for how these can be saved.
     """
 
-    return (
-        name.replace(" ", "_")
-        .replace("/", "_")
-        .replace("\\", "_")
-        .replace(":", "_")
-        .replace("*", "_")
-        .replace("?", "_")
-        .replace('"', "_")
-        .replace("<", "_")
-        .replace(">", "_")
-        .replace("|", "_")
-    )
+    return name.translate(FILENAME_TRANSLATION)
 
 # Write feedback to Supabase
 def insert_feedback(note_type, comment, player_name=None, position=None):
@@ -269,7 +359,7 @@ def insert_feedback(note_type, comment, player_name=None, position=None):
         "position": position
     }
 
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    supabase = get_supabase()
 
     try:
         response = supabase.table("feedback_notes").insert(payload).execute()
@@ -283,14 +373,55 @@ def encode_image_to_base64(logo_path):
     Helper to convert an image file to a base64 string.
     """
 
-    img = Image.open(logo_path)
-    buffered = BytesIO()
-    img.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode()
+    # The logo's are already PNG files, so the bytes can be encoded as they are
+    img_str = base64.b64encode(Path(logo_path).read_bytes()).decode()
     return f"data:image/png;base64,{img_str}"
 
+# Encode a downsized team logo
+def encode_logo_thumbnail(logo_path):
+    """
+    Helper to convert a team logo to a small WebP base64 string.
+    """
+
+    try:
+        with Image.open(logo_path) as img:
+            img.thumbnail(TEAM_LOGO_SIZE)
+            buffered = BytesIO()
+            img.save(buffered, format="WEBP", quality=85)
+
+    # Pillow builds without WebP support can't save it, so use the original PNG
+    except (KeyError, OSError):
+        return encode_image_to_base64(logo_path)
+
+    img_str = base64.b64encode(buffered.getvalue()).decode()
+    return f"data:image/webp;base64,{img_str}"
+
+# Index the team logo's
+@st.cache_resource
+def get_team_logo_index():
+    """
+    Scans the team logo folders once and returns {competition folder ('' for the general folder): {file stem: path}}.
+    """
+
+    index = {}
+    logos_dir = Path(TEAM_LOGOS_DIR)
+    if not logos_dir.exists():
+        return index
+
+    for entry in logos_dir.iterdir():
+
+        # Competition folders hold the logo's of the teams in that competition
+        if entry.is_dir():
+            index[entry.name] = {file.stem: file for file in entry.glob("*.png")}
+
+        # Logo's directly in the main folder are the general fallback
+        elif entry.suffix == ".png":
+            index.setdefault("", {})[entry.stem] = entry
+
+    return index
+
 # Get team logo's
-@st.cache_data
+@st.cache_resource
 def get_team_logo_base64(team_name, competition_name):
     """"
     Get team logo's based on team_name and competition name.
@@ -303,50 +434,38 @@ def get_team_logo_base64(team_name, competition_name):
         # Look if a teamname has a different name in the dictionary        
         logo_filename = TEAM_LOGO_MAPPING.get(team_name, team_name)
         safe_filename = sanitize_filename(logo_filename)
+        logo_index = get_team_logo_index()
         paths_to_try = []
 
         # Look for teamname within competition folder
         if competition_name:
-            safe_comp = competition_name.replace("/", "_").replace("\\", "_")
-            comp_folder = Path(TEAM_LOGOS_DIR) / safe_comp
-            
-            if comp_folder.exists():
+            safe_comp = competition_name.translate(FOLDERNAME_TRANSLATION)
+            comp_logos = logo_index.get(safe_comp)
+
+            if comp_logos is not None:
                 # Try exact matches in the comp folder first
-                paths_to_try.append(comp_folder / f"{safe_filename}.png")
-                
+                paths_to_try.append(comp_logos.get(safe_filename))
+
                 # Add Fuzzy search results
-                for file in comp_folder.glob("*.png"):
-                    if safe_filename.lower() in file.stem.lower():
-                        paths_to_try.append(file)
+                paths_to_try.extend(path for stem, path in comp_logos.items() if safe_filename.lower() in stem.lower())
 
         # Fallback to general folder
-        paths_to_try.append(Path(TEAM_LOGOS_DIR) / f"{safe_filename}.png")
-        
+        general_logos = logo_index.get("", {})
+        paths_to_try.append(general_logos.get(safe_filename))
+
         # Add original team name if mapping was used
         if logo_filename != team_name:
-            paths_to_try.append(Path(TEAM_LOGOS_DIR) / f"{sanitize_filename(team_name)}.png")
+            paths_to_try.append(general_logos.get(sanitize_filename(team_name)))
 
-        # Execute search and encode logo
+        # Encode the first logo that was found
         for logo_path in paths_to_try:
-            if logo_path.exists():
-                return encode_image_to_base64(logo_path)
+            if logo_path is not None:
+                return encode_logo_thumbnail(logo_path)
 
     except Exception:
         pass
     return None
 
-# Get the Impect player url
-def get_player_url(row):
-    """"
-    Finds the related player Impect url.
-    """
-
-    if pd.notna(row.get('impect_url')) and row.get('impect_url'):
-        return row['impect_url']
-    
-    # If not found, return None (nothing)
-    return None
-
 # Create team name column with logo
 def create_team_html_with_logo(row):
     """"
@@ -363,17 +482,86 @@ def create_team_html_with_logo(row):
         return f'<img src="{logo_b64}" height="20" style="vertical-align: middle; margin-right: 8px;">{team_name}'
     return team_name
 
-# Get gradient of main color
-def get_gradient_color(score, base_hex):
+# Create the Impect url column for a whole table
+def player_url_column(df):
     """
-    Returns gradient of the main color based on its value.
+    Returns the Impect url of every row, or None if it is missing.
     """
-    
-    norm = max(0, min(1, score / 100))
-    base = [int(base_hex.lstrip('#')[i:i+2], 16) for i in (0, 2, 4)]
-    return f'rgb({int(255-(255-base[0])*norm)}, {int(255-(255-base[1])*norm)}, {int(255-(255-base[2])*norm)})'
 
-# Function that creates the bar chart
+    if "impect_url" not in df.columns:
+        return None
+
+    urls = df["impect_url"]
+    return urls.where(urls.notna() & (urls != ""), None)
+
+# Create the team name with logo column for a whole table
+def team_html_with_logo_column(df):
+    """
+    Returns the team name with logo of every row, building the HTML once per team and competition.
+    """
+
+    # Number every distinct team and competition pair, keeping missing values as their own pair
+    team_codes, _ = pd.factorize(df["team_name"], use_na_sentinel=False)
+    comp_codes, comp_uniques = pd.factorize(df["competition_name"], use_na_sentinel=False)
+    _, first_rows, pair_codes = np.unique(team_codes * len(comp_uniques) + comp_codes, return_index=True, return_inverse=True)
+
+    # Build the HTML for the first row of every pair and spread it over the rows of that pair
+    team_names = df["team_name"].to_numpy()[first_rows]
+    competitions = df["competition_name"].to_numpy()[first_rows]
+    html_per_pair = np.array(
+        [create_team_html_with_logo({"team_name": team_name, "competition_name": competition})
+         for team_name, competition in zip(team_names, competitions)],
+        dtype=object
+    )
+    return html_per_pair[pair_codes]
+
+# Get the players selected in a table
+def get_selected_players(selected_rows, df):
+    """
+    Returns the names and data of the players selected in a table, gathering their rows from df in one lookup.
+    """
+
+    # Standardize AgGrid's output
+    if isinstance(selected_rows, pd.DataFrame):
+        selected_rows = selected_rows.to_dict('records')
+    if not selected_rows:
+        return [], []
+
+    # Find the rows of the selected players, skipping selections that are no longer in df
+    positions = df.index.get_indexer([row.get('_original_index') for row in selected_rows])
+    found = positions >= 0
+
+    names = [row.get(table_columns['player_name']) for row, is_found in zip(selected_rows, found) if is_found]
+    full_data = [player_data for _, player_data in df.take(positions[found]).iterrows()]
+    return names, full_data
+
+# Two-digit hex code of every color channel value
+CHANNEL_HEX = np.array([f"{i:02X}" for i in range(256)], dtype=object)
+
+# Add the table cell colors of the scores
+def add_score_colors(df):
+    """
+    Adds a '_color_<score>' column per category score, with the cell background color of that score.
+    """
+
+    # Scores below the threshold stay white, above it they scale up to FC Groningen green (62, 140, 94)
+    for col in ["physical", "attacking", "defending"]:
+        values = df[col].to_numpy(dtype=float)
+        factor = np.clip(np.nan_to_num((values - COLOR_THRESHOLD) / (100 - COLOR_THRESHOLD)), 0, 1)
+
+        # Round half up, like Math.round in the browser
+        r = np.floor(255 - factor * (255 - 62) + 0.5).astype(np.uint8)
+        g = np.floor(255 - factor * (255 - 140) + 0.5).astype(np.uint8)
+        b = np.floor(255 - factor * (255 - 94) + 0.5).astype(np.uint8)
+
+        # Build the hex codes from the channel lookup in one pass, instead of formatting every cell
+        colors = "#" + CHANNEL_HEX[r] + CHANNEL_HEX[g] + CHANNEL_HEX[b]
+        colors[values < COLOR_THRESHOLD] = "#FFFFFF"
+        colors[np.isnan(values)] = None
+        df[f"_color_{col}"] = colors
+
+# Function that creates the bar chart, cached per player row so reruns with the same selection reuse the figure
+@st.cache_resource(show_spinner=False, max_entries=100)
 def create_polarized_bar_chart(player_data):
     """
     Create polarized bar chart.
@@ -382,32 +570,20 @@ def create_polarized_bar_chart(player_data):
     # Get the selected position
     profile_key = player_data.get('position')
 
-    # Automatically sort metrics into categories based on the dictionary
-    active_metric_keys = position_profiles.get(profile_key, [])
-    
-    physical_keys = [k for k in active_metric_keys if metrics[k].category == MetricCategory.PHYSICAL]
-    attack_keys   = [k for k in active_metric_keys if metrics[k].category == MetricCategory.ATTACK]
-    defense_keys  = [k for k in active_metric_keys if metrics[k].category == MetricCategory.DEFENSE]
-    
-    all_keys = physical_keys + attack_keys + defense_keys
-
-    # Get the information shown per metric
-    hover_descriptions = [metrics[m].tooltip for m in active_metric_keys]
+    # Get the metrics of the position sorted into categories, with their labels, information and colors
+    all_keys, metric_labels, hover_descriptions, base = profile_buckets.get(profile_key, empty_profile_bucket)
 
-    # Get percentile scores and labels
-    percentile_values = [float(player_data.get(k, 0)) for k in all_keys]
-    metric_labels = [metrics[k].label.replace('\n', '<br>') for k in all_keys]
+    # Get percentile scores in one lookup, metrics missing from the data count as 0
+    percentile_values = player_data.reindex(all_keys, fill_value=0).to_numpy(dtype=float)
 
     # Get the category and total scores
-    physical_avg = float(player_data.get('physical', 0))
-    attack_avg   = float(player_data.get('attacking', 0))
-    defense_avg  = float(player_data.get('defending', 0))
+    physical_avg, attack_avg, defense_avg = player_data.reindex(['physical', 'attacking', 'defending'], fill_value=0).to_numpy(dtype=float)
     overall_avg  = float(player_data.get('total', np.mean([physical_avg, attack_avg, defense_avg])))
 
-    # Set colors
-    colors = ([get_gradient_color(v, '#3E8C5E') for v in percentile_values[:len(physical_keys)]] +
-              [get_gradient_color(v, '#E83F2A') for v in percentile_values[len(physical_keys):len(physical_keys)+len(attack_keys)]] +
-              [get_gradient_color(v, '#F2B533') for v in percentile_values[-len(defense_keys):]])
+    # Set colors: blend every bar from white to the color of its category in one pass
+    norm = np.clip(np.nan_to_num(percentile_values / 100), 0, 1)
+    rgb = (255 - (255 - base) * norm[:, None]).astype(np.uint8)
+    colors = ("#" + CHANNEL_HEX[rgb[:, 0]] + CHANNEL_HEX[rgb[:, 1]] + CHANNEL_HEX[rgb[:, 2]]).tolist()
 
     # Build Figure
     fig = go.Figure()
@@ -683,9 +859,47 @@ table_columns = {
     "total": "Totaal",
 }
 
+# Columns fetched from player_percentiles (everything else in the table is never read by the app)
+required_columns = list(dict.fromkeys(
+    ["player_id", "player_name", "team_name", "country", "age", "position", "position_profile",
+     "position_minutes", "total_minutes", "competition_name", "season_name", "european",
+     "physical", "attacking", "defending", "total"] +
+    [key for keys in position_profiles.values() for key in keys]
+))
+
 # Check whether all metrics assigned to position_profiles are defined correctly
 # validate_profiles(metrics, position_profiles)
 
+# Sort the metrics of every position profile into categories once, with the labels used in the radar charts
+empty_profile_categories = {cat.name.lower(): [] for cat in MetricCategory}
+profile_categories = {
+    profile: {
+        cat.name.lower(): [(key, metrics[key].label.replace('\n', ' '))
+                           for key in keys if key in metrics and metrics[key].category == cat]
+        for cat in MetricCategory
+    }
+    for profile, keys in position_profiles.items()
+}
+
+# Colors of the bars per category in the bar charts
+CATEGORY_RGB = {
+    MetricCategory.PHYSICAL: np.array([0x3E, 0x8C, 0x5E]),
+    MetricCategory.ATTACK: np.array([0xE8, 0x3F, 0x2A]),
+    MetricCategory.DEFENSE: np.array([0xF2, 0xB5, 0x33]),
+}
+
+# Sort the metrics of every position profile into the bar order of the charts once, with their labels, information and colors
+empty_profile_bucket = ([], [], [], np.empty((0, 3)))
+profile_buckets = {}
+for profile, categories in profile_categories.items():
+    bar_keys = [key for items in categories.values() for key, _ in items]
+    profile_buckets[profile] = (
+        bar_keys,
+        [metrics[key].label.replace('\n', '<br>') for key in bar_keys],
+        [metrics[key].tooltip for key in bar_keys],
+        np.array([CATEGORY_RGB[metrics[key].category] for key in bar_keys]).reshape(-1, 3),
+    )
+
 # Add feedback option
 if "show_feedback" not in st.session_state:
     st.session_state.show_feedback = False
@@ -695,8 +909,28 @@ def toggle_feedback():
 
 # X. Not sure where to put this yet
 FC_GRONINGEN_GREEN = "#3E8C5E"
+
+# Scores below this value get no color in the tables
+COLOR_THRESHOLD = 30
+
+# Hidden table columns with the cell colors of the scores
+score_color_columns = ["_color_physical", "_color_attacking", "_color_defending"]
+
+# Number of decimals per numeric table column
+round_decimals = {
+    "age": 1,
+    "total_minutes": 0,
+    "position_minutes": 0,
+    "physical": 1,
+    "attacking": 1,
+    "defending": 1,
+    "total": 1,
+}
 TEAM_LOGOS_DIR = "team_logos"
 
+# Bounding box of the team logo's, twice the largest height they are shown at (30px) so they stay sharp
+TEAM_LOGO_SIZE = (120, 60)
+
 TEAM_LOGO_MAPPING = {
 }
 
@@ -895,15 +1129,12 @@ st.markdown(
 with st.sidebar:
     try:
         # Add logo at the top of the sidebar
-        logo = Image.open("FC_Groningen.png")
-        buffered = BytesIO()
-        logo.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
+        logo_uri = encode_image_to_base64("FC_Groningen.png")
 
         st.markdown(
             f"""
             <div style="margin: 0; padding: 0 0 4px 0; line-height: 0; text-align: center;">
-                <img src="data:image/png;base64,{img_str}"
+                <img src="{logo_uri}"
                      style="width: 140px; height: auto; display: inline-block; margin: 0; padding: 0;
                             image-rendering: -webkit-optimize-contrast; image-rendering: crisp-edges;" />
             </div>
@@ -940,38 +1171,17 @@ with col4:
     min_defense = st.slider("Defensieve benchmark", min_value=0, max_value=100, value=0, step=1)
 
 # 4. GET DATA AND FILL SIDEBAR
-# Get percentile data
+# Get percentile data including the Impect urls
 with st.spinner('Ophalen van de data...'):
-    df_player_data = load_data_from_supabase()
-
-# Get Impect urls
-with st.spinner('Creëeren van Impect connectie...'):
-    df_impect_urls = load_impect_urls_from_supabase()
-
-# Merge Impect url to the players data
-if not df_impect_urls.empty:
-    # Create a unique lookup table from the URL data
-    url_lookup = df_impect_urls[['player_id', 'position', 'impect_url']].drop_duplicates(
-        subset=['player_id', 'position']
-    )
-
-    # Merge onto  main data
-    df_player_data = df_player_data.merge(
-        url_lookup,
-        on=['player_id', 'position'],
-        how='left'
-    )
+    df_player_data, df_player_display, player_rows = load_player_data()
 
 # Set custom position order
 custom_order = ["LB (AANV)", "LB (VERD)", "RB (AANV)", "RB (VERD)", "CB (AANV)", "CB (VERD)", 
                 "DM/CM (DEF)", "DM/CM (BTB)", "DM/CM (CREA)", "CAM (CREA)", "CAM (LOP)", 
                 "LW (BIN)", "LW (BUI)", "RW (BIN)", "RW (BUI)", "ST (DYN)", "ST (TARG)", "ST (DIEP)"]
 
-# Find unique variables to show in the dropdowns
-competitions = sorted(df_player_data["competition_name"].dropna().unique())
-seasons = sorted(df_player_data["season_name"].dropna().unique())
-raw_positions = df_player_data["position_profile"].dropna().unique()
-positions = sorted(raw_positions, key=lambda x: custom_order.index(x) if x in custom_order else 999)
+# Find unique variables to show in the dropdowns (computed once per data load)
+competitions, seasons, positions, age_min, age_max = get_dropdown_options()
 
 # Set default in the selection
 default_competitions = ["Eredivisie"] if "Eredivisie" in competitions else competitions
@@ -992,8 +1202,6 @@ teams = sorted(df_player_data[
 dropdown_teams = st.sidebar.multiselect("Club (optioneel)", teams, default=[])
 
 # Create age range slider
-age_min = int(np.nanmin(df_player_data["age"].values))
-age_max = int(np.nanmax(df_player_data["age"].values))
 age_range_slider = st.sidebar.slider(
     "Leeftijd range",
     min_value=age_min,
@@ -1009,36 +1217,42 @@ show_eu_only = st.sidebar.checkbox(
     help="Selecteer alleen spelers die een EU paspoort hebben"
 )
 
-# Create a filter mask based on the dropdowns
-mask = (
-    df_player_data["competition_name"].isin(dropdown_competition)
-    & df_player_data["season_name"].isin(dropdown_season)
-    & df_player_data["age"].between(age_range_slider[0], age_range_slider[1])
-    & df_player_data["position_profile"].isin(dropdown_positions)
-)
+# Create a filter mask based on the dropdowns, as plain numpy boolean arrays
+ages = df_player_data["age"].to_numpy()
+mask_clauses = [
+    df_player_data["competition_name"].isin(dropdown_competition).to_numpy(),
+    df_player_data["season_name"].isin(dropdown_season).to_numpy(),
+    (ages >= age_range_slider[0]) & (ages <= age_range_slider[1]),
+    df_player_data["position_profile"].isin(dropdown_positions).to_numpy(),
+]
 
 if dropdown_teams:
-    mask &= df_player_data["team_name"].isin(dropdown_teams)
+    mask_clauses.append(df_player_data["team_name"].isin(dropdown_teams).to_numpy())
 
 if show_eu_only and 'european' in df_player_data.columns:
-    mask &= (df_player_data["european"] == True)
+    mask_clauses.append((df_player_data["european"] == True).to_numpy())
 
-# Filter the data based on the mask
-df_filtered = df_player_data.loc[mask].copy()
+# Benchmarks at the top are part of the filter, so the top X is taken from the players that pass them
+benchmarks = {"physical": min_physical, "attacking": min_attack, "defending": min_defense}
+mask_clauses += [df_player_data[col].to_numpy(dtype=float) >= minimum for col, minimum in benchmarks.items()]
 
-# Sort the data based on the total count and add original rank
-df_filtered.sort_values("total", ascending=False, inplace=True, na_position="last")
-df_filtered["original_rank"] = range(1, len(df_filtered) + 1)
+mask = np.logical_and.reduce(mask_clauses)
 
-# Get the top X players
-df_top = df_filtered.head(int(top_n)).copy()
+# Get the positions of the players that pass the filters
+filtered_rows = np.flatnonzero(mask)
 
-# Filter the data based on the benchmarks at the top
-df_top = df_top[
-    (df_top["physical"] >= min_physical) &
-    (df_top["attacking"] >= min_attack) &
-    (df_top["defending"] >= min_defense)
-]
+# Get the top X players on total score: partition instead of sorting all filtered players (missing totals rank last)
+order_key = -np.nan_to_num(df_player_data["total"].to_numpy(dtype=float)[filtered_rows], nan=-np.inf)
+k = min(int(top_n), len(order_key))
+top_idx = np.argpartition(order_key, k - 1)[:k] if k < len(order_key) else np.arange(k)
+
+# Only sort the top X players
+top_idx = top_idx[np.argsort(order_key[top_idx], kind="stable")]
+top_rows = filtered_rows[top_idx]
+df_top = df_player_data.take(top_rows)
+
+# Add original rank
+df_top["original_rank"] = np.arange(1, k + 1)
 
 # If no players meet the criteria, return info message
 if len(df_top) == 0:
@@ -1048,24 +1262,9 @@ if len(df_top) == 0:
 # Add technical columns you need for the logic but don't want to show
 technical_cols = ["team_name", "impect_url"] 
 
-# Create dataframe that will be shown in the table
-df_show = df_top.copy()
-
-# Round numeric columns
-numeric_columns = ["age", "total_minutes", "position_minutes", "physical", "attacking", "defending", "total"]
-for col in numeric_columns:
-    if col in df_show.columns:
-        decimals = 0 if col in ["total_minutes", "position_minutes"] else 1
-        df_show[col] = df_show[col].round(decimals)
-
-# Create dynamic url and team logo columns
-df_show["player_url"] = df_show.apply(get_player_url, axis=1)
-df_show["team_with_logo_html"] = df_show.apply(create_team_html_with_logo, axis=1)
-df_show["_original_index"] = df_top.index
-
-# Reorder and rename columns
-df_show = df_show[list(table_columns.keys()) + ["player_url", "_original_index"]]
-df_show = df_show.rename(columns=table_columns)
+# Create dataframe that will be shown in the table from the prepared rows, which are already ordered and renamed
+df_show = df_player_display.take(top_rows)
+df_show.insert(0, table_columns["original_rank"], df_top["original_rank"].to_numpy())
 
 # Render the player url
 player_link_renderer = JsCode("""
@@ -1105,348 +1304,268 @@ function(params) {
 }
 """)
 
-# Create conditional formatting
-COLOR_THRESHOLD = 30
-gradient_js = JsCode(f"""
+# Create conditional formatting, the colors themselves are computed in add_score_colors
+def score_cell_style(key):
+    """
+    Returns the cell style that reads the precomputed color of a score column.
+    """
+
+    return JsCode(f"""
 function(params) {{
-    if (params.value == null || isNaN(params.value)) return {{}};
-    
-    let val = params.value;
-    let threshold = {COLOR_THRESHOLD};
-    
-    // If the value is below the threshold, keep it white/neutral
-    if (val < threshold) {{
-        return {{
-            'backgroundColor': '#FFFFFF',
-            'color': 'black',
-            'display': 'flex',
-            'alignItems': 'center',
-            'justifyContent': 'center',
-            'textAlign': 'center'
-        }};
-    }}
-    
-    // Scale the score
-    let factor = (val - threshold) / (100 - threshold); 
-    factor = Math.min(1, Math.max(0, factor)); 
-    
-    // Get RGB score of FC Groningen green
-    let r = Math.round(255 - (factor * (255 - 62)));
-    let g = Math.round(255 - (factor * (255 - 140)));
-    let b = Math.round(255 - (factor * (255 - 94)));
-    
-    let backgroundColor = 'rgb(' + r + ',' + g + ',' + b + ')';
-    let textColor = factor > 0.6 ? 'white' : 'black';
-    
-    return {{
+    let backgroundColor = params.data['_color_{key}'];
+    if (backgroundColor == null) return {{}};
+
+    let style = {{
         'backgroundColor': backgroundColor,
-        'color': textColor,
-        'fontWeight': 'normal',
-        'border': '3px solid #FFFFFF',
-        'borderRadius': '8px',
+        'color': 'black',
         'display': 'flex',
         'alignItems': 'center',
         'justifyContent': 'center',
         'textAlign': 'center'
     }};
-}}
-""")
-
-# 5. CREATE TOP TABLE
-gb = GridOptionsBuilder.from_dataframe(df_show)
-
-# Set the width of specific columns
-gb.configure_column(table_columns["original_rank"], width=80, pinned="left", sortable=True, type=["numericColumn"])
-gb.configure_column(table_columns["player_name"], width=180, pinned="left", cellRenderer=player_link_renderer)
-gb.configure_column(table_columns["team_with_logo_html"], width=200, cellRenderer=team_logo_renderer)
-
-# Automatically configure the rest of the columns from the dictionary
-for key, label in table_columns.items():
-    if key not in ["original_rank", "player_name", "team_with_logo_html", "position_profile"]:
-        is_numeric = key in ["age", "total_minutes", "position_minutes", "physical", "attacking", "defending", "total"]
-        
-        col_config = {
-                "width": 140, 
-                "type": ["numericColumn"] if is_numeric else [],
-                "sortingOrder": ["desc", "asc", None]
-            }
-        
-        # Keep the thousand separator for minutes
-        if key in ["total_minutes", "position_minutes"]:
-            col_config["valueFormatter"] = number_dot_formatter
-            
-        # Apply the dynamic gradient to metrics
-        if key in ["physical", "attacking", "defending"]:
-            col_config["cellStyle"] = gradient_js
-            
-        gb.configure_column(label, **col_config)
-
-# Hide the technical helper columns
-gb.configure_column("player_url", hide=True)
-gb.configure_column("_original_index", hide=True)
-
-# Final settings
-gb.configure_default_column(sortable=True, filterable=False, resizable=True)
-gb.configure_selection(selection_mode='multiple', use_checkbox=True)
-
-gridOptions = gb.build()
-
-top_grid_response = AgGrid(
-    df_show,
-    gridOptions=gridOptions,
-    enable_enterprise_modules=False,
-    allow_unsafe_jscode=True,
-    update_mode=GridUpdateMode.SELECTION_CHANGED,
-    height=615,
-    fit_columns_on_grid_load=False,
-    theme='streamlit'
-)
 
-# Check which players are selected
-selected_from_top_table = []
-selected_from_top_table_full_data = []
-
-# Ensure grid_response isn't empty and has selected rows
-if top_grid_response and top_grid_response.get('selected_rows') is not None:
-    selected_rows = top_grid_response['selected_rows']
-    
-    # Standardize AgGrid's output
-    if isinstance(selected_rows, pd.DataFrame):
-        rows = selected_rows.to_dict('records')
-    else:
-        rows = selected_rows
+    // Colored scores get a rounded cell and white text from 60% of the color scale
+    if (params.value >= {COLOR_THRESHOLD}) {{
+        style['color'] = (params.value - {COLOR_THRESHOLD}) / {100 - COLOR_THRESHOLD} > 0.6 ? 'white' : 'black';
+        style['fontWeight'] = 'normal';
+        style['border'] = '3px solid #FFFFFF';
+        style['borderRadius'] = '8px';
+    }}
 
-    # Get the data of the selected players
-    for row in rows: 
-        name_col = table_columns.get('player_name', 'player_name')
-        selected_from_top_table.append(row.get(name_col))
+    return style;
+}}
+""")
 
-        idx = row.get('_original_index')
-        if idx is not None and idx in df_top.index:
-            selected_from_top_table_full_data.append(df_top.loc[idx])
+score_cell_styles = {key: score_cell_style(key) for key in ["physical", "attacking", "defending"]}
 
+# Build the options of the player tables
+@st.cache_data(show_spinner=False)
+def build_grid_options(_df, column_types):
+    """
+    Returns the AgGrid options of a player table, built once for the table columns and shared by both tables.
+    """
 
-# 6. CREATE CONTAINER FOR RADAR PLOTS
-st.subheader("Radarplots")
-st.markdown('<div class="sb-rule"></div>', unsafe_allow_html=True)
-radar_plot_container = st.container()
+    gb = GridOptionsBuilder.from_dataframe(_df)
 
-# 7. CREATE SEARCH TABLE
-# Add title
-st.subheader("Zoekopdracht")
-st.markdown('<div class="sb-rule"></div>', unsafe_allow_html=True)
+    # Set the width of specific columns
+    gb.configure_column(table_columns["original_rank"], width=80, pinned="left", sortable=True, type=["numericColumn"])
+    gb.configure_column(table_columns["player_name"], width=180, pinned="left", cellRenderer=player_link_renderer)
+    gb.configure_column(table_columns["team_with_logo_html"], width=200, cellRenderer=team_logo_renderer)
 
-# Create list with all available players
-available_players = sorted(df_player_data["player_name"].unique().tolist())
+    # Automatically configure the rest of the columns from the dictionary
+    for key, label in table_columns.items():
+        if key not in ["original_rank", "player_name", "team_with_logo_html", "position_profile"]:
+            is_numeric = key in ["age", "total_minutes", "position_minutes", "physical", "attacking", "defending", "total"]
 
-# Create search field
-search_selected_players = st.multiselect(
-    "Selecteer speler(s) en zie alle beschikbare data.",
-    options=available_players,
-    default=[],
-    help="Een speler kan er niet tussen staan als we geen data van die competitie afnemen of als hij onvoldoende minuten op een specifieke positie heeft gemaakt"
-)
+            col_config = {
+                    "width": 140, 
+                    "type": ["numericColumn"] if is_numeric else [],
+                    "sortingOrder": ["desc", "asc", None]
+                }
 
-# Filter and sort data
-df_selected_players = df_player_data[df_player_data['player_name'].isin(search_selected_players)].copy().sort_values(by='total', ascending=False)
+            # Keep the thousand separator for minutes
+            if key in ["total_minutes", "position_minutes"]:
+                col_config["valueFormatter"] = number_dot_formatter
 
-# Create master index
-df_selected_players["_original_index"] = df_selected_players.index
+            # Apply the dynamic gradient to metrics
+            if key in ["physical", "attacking", "defending"]:
+                col_config["cellStyle"] = score_cell_styles[key]
 
-# Reset the index
-df_selected_players.reset_index(drop=True, inplace=True)
+            gb.configure_column(label, **col_config)
 
-# Add helper columns
-df_selected_players['original_rank'] = df_selected_players.index + 1
-df_selected_players["player_url"] = df_selected_players.apply(get_player_url, axis=1)
-df_selected_players["team_with_logo_html"] = df_selected_players.apply(create_team_html_with_logo, axis=1)
+    # Hide the technical helper columns
+    gb.configure_column("player_url", hide=True)
+    gb.configure_column("_original_index", hide=True)
+    for color_col in score_color_columns:
+        gb.configure_column(color_col, hide=True)
+    gb.configure_column("::auto_unique_id::", hide=True)
 
-# Round numeric columns
-numeric_columns = ["age", "total_minutes", "position_minutes", "physical", "attacking", "defending", "total"]
-for col in numeric_columns:
-    if col in df_selected_players.columns:
-        decimals = 0 if col in ["total_minutes", "position_minutes"] else 1
-        df_selected_players[col] = df_selected_players[col].round(decimals)
+    # Final settings
+    gb.configure_default_column(sortable=True, filterable=False, resizable=True)
+    gb.configure_selection(selection_mode='multiple', use_checkbox=True)
 
-# Reorder and rename columns
-all_needed_cols = list(table_columns.keys()) + ["player_url", "_original_index"]
-df_selected_players = df_selected_players[[c for c in all_needed_cols if c in df_selected_players.columns]]
-df_selected_players = df_selected_players.rename(columns=table_columns)
+    return gb.build()
 
-# Create third table
-gb = GridOptionsBuilder.from_dataframe(df_selected_players)
+# Render the tables and radar plots, selecting players only reruns this part of the page
+@st.fragment
+def render_player_tables(df_player_data, df_player_display, player_rows, df_top, df_show):
+    """
+    Renders the top table, the search table and the radar plots of the selected players.
+    """
 
-# Set the width of specific columns
-gb.configure_column(table_columns["original_rank"], width=80, pinned="left", sortable=True, type=["numericColumn"])
-gb.configure_column(table_columns["player_name"], width=180, pinned="left", cellRenderer=player_link_renderer)
-gb.configure_column(table_columns["team_with_logo_html"], width=200, cellRenderer=team_logo_renderer)
+    # 5. CREATE TOP TABLE
+    gridOptions = build_grid_options(df_show, tuple(df_show.dtypes.astype(str).items()))
 
-# Automatically configure the rest of the columns from the dictionary
-for key, label in table_columns.items():
-    if key not in ["original_rank", "player_name", "team_with_logo_html", "position_profile"]:
-        is_numeric = key in ["age", "total_minutes", "position_minutes", "physical", "attacking", "defending", "total"]
-        
-        col_config = {
-                "width": 140, 
-                "type": ["numericColumn"] if is_numeric else [],
-                "sortingOrder": ["desc", "asc", None]
-            }
-        
-        # Keep the thousand separator for minutes
-        if key in ["total_minutes", "position_minutes"]:
-            col_config["valueFormatter"] = number_dot_formatter
-            
-        # Apply the dynamic gradient to metrics
-        if key in ["physical", "attacking", "defending"]:
-            col_config["cellStyle"] = gradient_js
-            
-        gb.configure_column(label, **col_config)
-
-# Hide the technical helper columns
-gb.configure_column("player_url", hide=True)
-gb.configure_column("_original_index", hide=True)
-gb.configure_column("::auto_unique_id::", hide=True)
-
-# Final settings
-gb.configure_default_column(sortable=True, filterable=False, resizable=True)
-gb.configure_selection(selection_mode='multiple', use_checkbox=True)
-
-gridOptions = gb.build()
-
-search_grid_response = None
-
-if not df_selected_players.empty:
-    search_grid_response = AgGrid(
-        df_selected_players,
+    top_grid_response = AgGrid(
+        df_show,
         gridOptions=gridOptions,
         enable_enterprise_modules=False,
         allow_unsafe_jscode=True,
         update_mode=GridUpdateMode.SELECTION_CHANGED,
-        height= min(615, 34.5 + len(df_selected_players) * 29.1),
+        data_return_mode=DataReturnMode.AS_INPUT,
+        height=615,
         fit_columns_on_grid_load=False,
         theme='streamlit'
     )
 
-# Check which boxes are checked
-selected_from_search_table = []
-selected_from_search_table_full_data = []
-
-# Check whether players are selected in the search table, only when it is actually filled
-selected_rows = []
-if 'search_grid_response' in locals() and search_grid_response is not None:
-    selected_rows = search_grid_response.get('selected_rows', [])
-
-# Convert DataFrame to list-of-dicts if needed
-if isinstance(selected_rows, pd.DataFrame):
-    selected_rows = selected_rows.to_dict('records')
-
-# Check if there are any selected rows
-if isinstance(selected_rows, list) and len(selected_rows) > 0:
-    for row in selected_rows:
-        name_label = table_columns.get('player_name', 'Speler')
-        p_name = row.get(name_label)
-        idx = row.get('_original_index') or row.get('_search_original_index')
-        
-        # Only append if index is valid
-        if idx is not None and idx in df_player_data.index:
-            selected_from_search_table.append(p_name)
-            selected_from_search_table_full_data.append(df_player_data.loc[idx])
+    # Check which players are selected
+    selected_from_top_table, selected_from_top_table_full_data = get_selected_players(
+        top_grid_response.get('selected_rows') if top_grid_response else None, df_top
+    )
 
-# 8. FILL RADARPLOT CONTAINER
-with radar_plot_container:
-    
-    # Combine the selections from both tables
-    all_selected_names = selected_from_top_table + selected_from_search_table
-    all_selected_data = selected_from_top_table_full_data + selected_from_search_table_full_data
 
-    # Check how many players are selected
-    total_selected = len(all_selected_names)
-    
-    if total_selected > 0:
-        # Show warning if more than 2 players are selected
-        if total_selected > 2:
-            st.warning(f"Je hebt {total_selected} spelers geselecteerd, alleen de eerste 2 worden getoond.")
-
-        # Only show the first two players
-        players_to_compare = all_selected_names[:2]
-        players_data_to_compare = all_selected_data[:2]
-
-        st.markdown("""
-        <style>
-        @keyframes fadeIn {
-            from { opacity: 0; transform: translateY(10px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
-        .stPlotlyChart { animation: fadeIn 0.5s ease-in-out; }
-        </style>
-        """, unsafe_allow_html=True)
-
-        cols = st.columns(2)
-
-        # Create radar plot
-        for i, player_name in enumerate(players_to_compare):
-            player_data = players_data_to_compare[i]
-
-            with cols[i]:
-
-                # Create title
-                pos_profile = player_data.get('position_profile', '')
-                title_text = f"{player_name}  |  {pos_profile}"
-
-                st.markdown(
-                    f"<p style='font-size: 1.5rem; font-weight: 600; margin-bottom: 0.5rem; text-align: center;'>{title_text}</p>",
-                    unsafe_allow_html=True
-                )
-
-                # Get information for subtitles
-                team_name = player_data['team_name']
-                competition = player_data.get('competition_name')
-                season = player_data.get('season_name')
-                team_logo_b64 = get_team_logo_base64(team_name, competition)
-
-                # Format the numbers with a thousand separator
-                total_minutes = f"{int(player_data['total_minutes']):,}".replace(',', '.')
-                position_minutes = f"{int(player_data['position_minutes']):,}".replace(',', '.')
-                
-                # Subtitles
-                line1 = f"{team_name} | {competition} | {season}"
-                line2 = f"{int(player_data['age'])} jaar · Nationaliteit: {player_data['country']} · Totale minuten: {total_minutes} · Minuten op positie: {position_minutes}"
-
-                # Customaize substitle with team logo
-                logo_html = f'<img src="{team_logo_b64}" height="30" style="vertical-align: middle; margin-right: 8px;">' if team_logo_b64 else ""
-                st.markdown(
-                    f"""<div style="font-size: 1.1rem; margin-bottom: 1rem; line-height: 1.4; text-align: center;">
-                        {logo_html} <b>{line1}</b><br>
-                        <span style="font-size: 0.95rem; color: #666;">{line2}</span>
-                    </div>""", 
-                    unsafe_allow_html=True
-                )
-
-                # Create the chart
-                fig = create_polarized_bar_chart(player_data)
-                
-                chart_key = f"comparison_chart_{i}_{player_name.replace(' ', '_')}"
-                st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False}, key=chart_key)
-
-                # Add information at the bottom
-                st.markdown(
-                    """<p style='text-align: center; font-family: "Proxima Nova", sans-serif; 
-                    font-size: 0.8rem; color: #888; margin-top: -15px;'>
-                    Een score van 50 is het gemiddelde op die positie binnen die competitie <br>
-                    Data is een combinatie van Impect en SkillCorner
-                    </p>""", 
-                    unsafe_allow_html=True
-                )
-    else:
-        st.markdown(
-        """
-        <div class="custom-info-box">
-            Selecteer spelers in de ranglijst en/of zoekopdracht tabellen om hun radarplots te zien.
-        </div>
-        """,
-        unsafe_allow_html=True
+    # 6. CREATE CONTAINER FOR RADAR PLOTS
+    st.subheader("Radarplots")
+    st.markdown('<div class="sb-rule"></div>', unsafe_allow_html=True)
+    radar_plot_container = st.container()
+
+    # 7. CREATE SEARCH TABLE
+    # Add title
+    st.subheader("Zoekopdracht")
+    st.markdown('<div class="sb-rule"></div>', unsafe_allow_html=True)
+
+    # Create list with all available players
+    available_players = get_available_players()
+
+    # Create search field
+    search_selected_players = st.multiselect(
+        "Selecteer speler(s) en zie alle beschikbare data.",
+        options=available_players,
+        default=[],
+        help="Een speler kan er niet tussen staan als we geen data van die competitie afnemen of als hij onvoldoende minuten op een specifieke positie heeft gemaakt"
+    )
+
+    # Gather the rows of the selected players, sort them on the unrounded total (missing totals last) and take the prepared rows
+    selected_rows = np.array(sorted(chain.from_iterable(player_rows.get(name, ()) for name in search_selected_players)), dtype=np.intp)
+    selected_rows = selected_rows[np.argsort(-df_player_data['total'].to_numpy(dtype=float)[selected_rows], kind="stable")]
+    df_selected_players = df_player_display.take(selected_rows)
+
+    # Reset the index
+    df_selected_players.reset_index(drop=True, inplace=True)
+
+    # Add helper columns
+    df_selected_players.insert(0, table_columns["original_rank"], df_selected_players.index + 1)
+
+    # Create third table
+    gridOptions = build_grid_options(df_selected_players, tuple(df_selected_players.dtypes.astype(str).items()))
+
+    search_grid_response = None
+
+    if not df_selected_players.empty:
+        search_grid_response = AgGrid(
+            df_selected_players,
+            gridOptions=gridOptions,
+            enable_enterprise_modules=False,
+            allow_unsafe_jscode=True,
+            update_mode=GridUpdateMode.SELECTION_CHANGED,
+            data_return_mode=DataReturnMode.AS_INPUT,
+            height= min(615, 34.5 + len(df_selected_players) * 29.1),
+            fit_columns_on_grid_load=False,
+            theme='streamlit'
+        )
+
+    # Check which boxes are checked, only when the search table is actually filled
+    selected_from_search_table, selected_from_search_table_full_data = get_selected_players(
+        search_grid_response.get('selected_rows') if search_grid_response is not None else None, df_player_data
     )
 
+    # 8. FILL RADARPLOT CONTAINER
+    with radar_plot_container:
+
+        # Combine the selections from both tables
+        all_selected_names = selected_from_top_table + selected_from_search_table
+        all_selected_data = selected_from_top_table_full_data + selected_from_search_table_full_data
+
+        # Check how many players are selected
+        total_selected = len(all_selected_names)
+
+        if total_selected > 0:
+            # Show warning if more than 2 players are selected
+            if total_selected > 2:
+                st.warning(f"Je hebt {total_selected} spelers geselecteerd, alleen de eerste 2 worden getoond.")
+
+            # Only show the first two players
+            players_to_compare = all_selected_names[:2]
+            players_data_to_compare = all_selected_data[:2]
+
+            st.markdown("""
+            <style>
+            @keyframes fadeIn {
+                from { opacity: 0; transform: translateY(10px); }
+                to { opacity: 1; transform: translateY(0); }
+            }
+            .stPlotlyChart { animation: fadeIn 0.5s ease-in-out; }
+            </style>
+            """, unsafe_allow_html=True)
+
+            cols = st.columns(2)
+
+            # Create radar plot
+            for i, player_name in enumerate(players_to_compare):
+                player_data = players_data_to_compare[i]
+
+                with cols[i]:
+
+                    # Create title
+                    pos_profile = player_data.get('position_profile', '')
+                    title_text = f"{player_name}  |  {pos_profile}"
+
+                    st.markdown(
+                        f"<p style='font-size: 1.5rem; font-weight: 600; margin-bottom: 0.5rem; text-align: center;'>{title_text}</p>",
+                        unsafe_allow_html=True
+                    )
+
+                    # Get information for subtitles
+                    team_name = player_data['team_name']
+                    competition = player_data.get('competition_name')
+                    season = player_data.get('season_name')
+                    team_logo_b64 = get_team_logo_base64(team_name, competition)
+
+                    # Format the numbers with a thousand separator
+                    total_minutes = f"{int(player_data['total_minutes']):,}".replace(',', '.')
+                    position_minutes = f"{int(player_data['position_minutes']):,}".replace(',', '.')
+
+                    # Subtitles
+                    line1 = f"{team_name} | {competition} | {season}"
+                    line2 = f"{int(player_data['age'])} jaar · Nationaliteit: {player_data['country']} · Totale minuten: {total_minutes} · Minuten op positie: {position_minutes}"
+
+                    # Customaize substitle with team logo
+                    logo_html = f'<img src="{team_logo_b64}" height="30" style="vertical-align: middle; margin-right: 8px;">' if team_logo_b64 else ""
+                    st.markdown(
+                        f"""<div style="font-size: 1.1rem; margin-bottom: 1rem; line-height: 1.4; text-align: center;">
+                            {logo_html} <b>{line1}</b><br>
+                            <span style="font-size: 0.95rem; color: #666;">{line2}</span>
+                        </div>""", 
+                        unsafe_allow_html=True
+                    )
+
+                    # Create the chart
+                    fig = create_polarized_bar_chart(player_data)
+
+                    chart_key = f"comparison_chart_{i}_{player_name.replace(' ', '_')}"
+                    st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False}, key=chart_key)
+
+                    # Add information at the bottom
+                    st.markdown(
+                        """<p style='text-align: center; font-family: "Proxima Nova", sans-serif; 
+                        font-size: 0.8rem; color: #888; margin-top: -15px;'>
+                        Een score van 50 is het gemiddelde op die positie binnen die competitie <br>
+                        Data is een combinatie van Impect en SkillCorner
+                        </p>""", 
+                        unsafe_allow_html=True
+                    )
+        else:
+            st.markdown(
+            """
+            <div class="custom-info-box">
+                Selecteer spelers in de ranglijst en/of zoekopdracht tabellen om hun radarplots te zien.
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+
+render_player_tables(df_player_data, df_player_display, player_rows, df_top, df_show)
+
 # 9. Add feedback button
 # Floating feedback button
 st.markdown("""